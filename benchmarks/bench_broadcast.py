@@ -0,0 +1,43 @@
+"""Замер устойчивой скорости рассылки и поведения при ошибках Telegram
+
+Запуск из корня проекта: python -m benchmarks.bench_broadcast
+"""
+import argparse
+import asyncio
+import time
+from tests.fake_bot import FakeBot
+from utils.broadcaster import Broadcaster
+from utils.rate_limiter import TokenBucket, ChatRateLimiter
+
+async def run(users, rate, concurrency, latency):
+    # Чат 10 получит flood control, чат 20 - две сетевые ошибки подряд
+    bot = FakeBot(latency=latency, retry_after={10: 2}, network_errors={20: 2})
+    limiter = TokenBucket(rate)
+    broadcaster = Broadcaster(bot, limiter=limiter, per_chat_limiter=ChatRateLimiter(), concurrency=concurrency, backoff_base=0.1)
+
+    started = time.monotonic()
+    sent, failed = await broadcaster.run(range(1, users + 1), text="benchmark")
+    elapsed = time.monotonic() - started
+
+    # Устойчивая скорость считается по окну без стартового всплеска ведра
+    stamps = [stamp for stamp, _ in bot.sent]
+    steady = stamps[int(rate):]
+    steady_rate = (len(steady) - 1) / (steady[-1] - steady[0]) if len(steady) > 1 else 0.0
+
+    print(f"Пользователей: {users}, лимит: {rate}/с, конкурентность: {concurrency}")
+    print(f"Отправлено: {sent}, ошибок: {failed}, вызовов API: {bot.calls}, повторов: {broadcaster.retries}")
+    print(f"Время: {elapsed:.2f} с, средняя скорость: {sent / elapsed:.1f}/с, устойчивая: {steady_rate:.1f}/с")
+    print(f"Flood control для чата 10 обработан: {10 in {chat for _, chat in bot.sent}}")
+    print(f"Сетевые ошибки для чата 20 обработаны: {20 in {chat for _, chat in bot.sent}}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=25)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(run(args.users, args.rate, args.concurrency, args.latency))
+
+if __name__ == "__main__":
+    main()
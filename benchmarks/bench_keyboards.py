@@ -0,0 +1,40 @@
+"""Замер стоимости построения клавиатур с кэшем и без него
+
+Запуск из корня проекта: python -m benchmarks.bench_keyboards
+"""
+import argparse
+import timeit
+from keyboards.admin_keyboards import admin_main_menu, admin_message_status, broadcast_job_controls
+from keyboards.user_keyboards import confirm_button, main_menu_keyboard
+
+KEYBOARDS = [
+    ("confirm_button", confirm_button, (42,)),
+    ("admin_message_status", admin_message_status, (42,)),
+    ("broadcast_job_controls", broadcast_job_controls, (42,)),
+    ("main_menu_keyboard", main_menu_keyboard, ()),
+    ("admin_main_menu", admin_main_menu, ()),
+]
+
+def measure(func, args, number):
+    return min(timeit.repeat(lambda: func(*args), number=number, repeat=5)) / number * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--recipients", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"{'Клавиатура':<24} {'без кэша, мкс':>14} {'с кэшем, мкс':>13} {'ускорение':>10}")
+    for name, factory, factory_args in KEYBOARDS:
+        # __wrapped__ - исходная функция без кэширования
+        uncached = measure(factory.__wrapped__, factory_args, args.number)
+        cached = measure(factory, factory_args, args.number)
+        print(f"{name:<24} {uncached:>14.2f} {cached:>13.2f} {uncached / cached:>9.0f}x")
+
+    # Кнопка подтверждения в цикле рассылки: N построений против одного
+    uncached = measure(confirm_button.__wrapped__, (7,), args.number) * args.recipients / 1000
+    cached = measure(confirm_button, (7,), args.number) * args.recipients / 1000
+    print(f"Кнопка подтверждения для {args.recipients} получателей: {uncached:.1f} мс без кэша, {cached:.2f} мс с кэшем")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Замер процессорного времени рассылки на 10 тыс. отправок: bot.send_message против PreparedMessage
+
+Фейковый Bot API запускается в отдельном процессе, поэтому в замер попадает только
+процессорное время процесса бота (time.process_time).
+
+Запуск из корня проекта: python -m benchmarks.bench_payload
+"""
+import argparse
+import asyncio
+import itertools
+import multiprocessing
+import time
+from aiohttp import web
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.enums import ParseMode
+from keyboards.user_keyboards import confirm_button
+from utils.broadcaster import Broadcaster
+from utils.prepared_message import PreparedMessage
+from utils.rate_limiter import TokenBucket, ChatRateLimiter
+
+TOKEN = "123456:TEST"
+TEXT = "📢 *Важное сообщение:*\n\n" + "Текст рассылки для замера. " * 20
+
+def run_fake_api(port):
+    """Фейковый Bot API: отвечает на sendMessage так же, как Telegram"""
+    message_ids = itertools.count(1)
+
+    async def send_message(request):
+        if request.content_type == "application/json":
+            data = await request.json()
+        else:
+            data = await request.post()
+        return web.json_response({
+            "ok": True,
+            "result": {
+                "message_id": next(message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(data["chat_id"]), "type": "private"},
+                "text": data["text"],
+            },
+        })
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/sendMessage", send_message)
+    web.run_app(app, host="127.0.0.1", port=port, print=None)
+
+async def measure(bot, sends, concurrency, payload=None, **kwargs):
+    broadcaster = Broadcaster(bot, limiter=TokenBucket(1e9), per_chat_limiter=ChatRateLimiter(rate=1e9), concurrency=concurrency)
+    started_cpu = time.process_time()
+    started = time.monotonic()
+    sent, failed = await broadcaster.run(range(1, sends + 1), payload=payload, **kwargs)
+    return time.process_time() - started_cpu, time.monotonic() - started, sent, failed
+
+async def run(sends, concurrency, port):
+    session = AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{port}"))
+    bot = Bot(TOKEN, session=session, default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN))
+    markup = confirm_button(1)
+
+    # Прогрев соединений и импортов
+    await measure(bot, 200, concurrency, text=TEXT, reply_markup=markup)
+
+    before = await measure(bot, sends, concurrency, text=TEXT, reply_markup=markup, parse_mode="Markdown")
+    payload = PreparedMessage(bot, text=TEXT, reply_markup=markup, parse_mode="Markdown")
+    after = await measure(bot, sends, concurrency, payload=payload)
+    await bot.session.close()
+
+    for title, (cpu, elapsed, sent, failed) in (("bot.send_message", before), ("PreparedMessage", after)):
+        print(
+            f"{title:<18} CPU: {cpu:.2f} с ({cpu / sent * 1e6:.0f} мкс на отправку), "
+            f"время: {elapsed:.2f} с, отправлено: {sent}, ошибок: {failed}"
+        )
+    print(f"Процессорное время на {sends} отправок сократилось в {before[0] / after[0]:.1f} раза")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sends", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8098)
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=run_fake_api, args=(args.port,), daemon=True)
+    server.start()
+    time.sleep(1)
+    try:
+        asyncio.run(run(args.sends, args.concurrency, args.port))
+    finally:
+        server.terminate()
+
+if __name__ == "__main__":
+    main()
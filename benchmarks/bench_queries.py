@@ -0,0 +1,128 @@
+"""Время запросов статистики и кодовых фраз без вторичных индексов и с ними
+
+Создает синтетическую базу (по умолчанию 100 тыс. пользователей и 500 рассылок)
+на актуальной схеме и замеряет запросы db_operations сначала без индексов,
+созданных миграциями, а затем с ними.
+
+Запуск из корня проекта: python -m benchmarks.bench_queries
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from database import db_operations
+from database.connection import init_pool, close_pool, get_connection
+from database.migrations import SCHEMA_VERSION, run_migrations
+
+def fill_database(path, users, broadcasts, confirmations_per_broadcast):
+    """Заполняет базу синтетическими данными"""
+    rnd = random.Random(42)
+    started_at = datetime(2025, 1, 1)
+
+    with sqlite3.connect(path) as db:
+        db.executemany(
+            "INSERT INTO users (user_id, username, first_name, last_name, joined_at, is_admin, freebilet_confirmed, delivery_state) VALUES (?, ?, ?, ?, ?, 0, ?, ?)",
+            (
+                (100000 + i, f"user{i}", f"Имя{i}", None, started_at + timedelta(minutes=i), rnd.random() < 0.7,
+                 "blocked" if rnd.random() < 0.05 else "active")
+                for i in range(users)
+            )
+        )
+        db.execute(
+            "INSERT INTO users (user_id, username, first_name, joined_at, is_admin) VALUES (1, 'admin', 'Админ', ?, 1)",
+            (started_at,)
+        )
+        db.executemany(
+            "INSERT INTO messages (id, message_text, sent_at, sender_id, is_code_phrase, status) VALUES (?, ?, ?, 1, ?, ?)",
+            (
+                (i, f"Сообщение {i}", started_at + timedelta(hours=i), int(i % 5 == 0), rnd.choice(("active", "outdated", "deleted")))
+                for i in range(1, broadcasts + 1)
+            )
+        )
+        db.executemany(
+            "INSERT INTO confirmations (message_id, user_id, confirmed_at) VALUES (?, ?, ?)",
+            (
+                (message_id, 100000 + user, started_at)
+                for message_id in range(1, broadcasts + 1)
+                for user in rnd.sample(range(users), confirmations_per_broadcast)
+            )
+        )
+
+async def measure(label, message_id, repeats):
+    """Замеряет среднее время запросов в миллисекундах"""
+    queries = {
+        "get_confirmations_for_message": lambda: db_operations.get_confirmations_for_message(message_id),
+        "get_unconfirmed_users": lambda: db_operations.get_unconfirmed_users(message_id),
+        "get_unconfirmed_users_page": lambda: db_operations.get_unconfirmed_users_page(message_id),
+        "get_all_code_phrases": db_operations.get_all_code_phrases,
+        "get_freebilet_users(confirmed=False)": lambda: db_operations.get_freebilet_users(confirmed=False),
+    }
+
+    print(f"\n{label}")
+    results = {}
+    for name, query in queries.items():
+        await query()
+        started = time.perf_counter()
+        for _ in range(repeats):
+            await query()
+        results[name] = (time.perf_counter() - started) / repeats * 1000
+        print(f"  {name:40s} {results[name]:9.2f} мс")
+    return results
+
+async def run(users, broadcasts, confirmations, repeats):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        await init_pool(path)
+
+        async with get_connection() as db:
+            await run_migrations(db)
+        started = time.perf_counter()
+        await asyncio.to_thread(fill_database, path, users, broadcasts, confirmations)
+        print(f"База заполнена за {time.perf_counter() - started:.1f} с: "
+              f"{users} пользователей, {broadcasts} рассылок, {broadcasts * confirmations} подтверждений")
+
+        # Вторичные индексы пользователей, сообщений и подтверждений удаляются на время первого замера
+        async with get_connection() as db:
+            cursor = await db.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+                "AND tbl_name IN ('users', 'messages', 'confirmations')"
+            )
+            indexes = await cursor.fetchall()
+            for name, _ in indexes:
+                await db.execute(f"DROP INDEX {name}")
+            await db.commit()
+
+        message_id = broadcasts // 2
+        before = await measure("Без индексов", message_id, repeats)
+
+        async with get_connection() as db:
+            started = time.perf_counter()
+            for _, sql in indexes:
+                await db.execute(sql)
+            await db.execute("ANALYZE")
+            await db.commit()
+        print(f"\nСоздание индексов ({', '.join(name for name, _ in indexes)}) заняло {time.perf_counter() - started:.1f} с")
+
+        after = await measure(f"С индексами (версия схемы {SCHEMA_VERSION})", message_id, repeats)
+
+        print("\nУскорение:")
+        for name in before:
+            print(f"  {name:40s} x{before[name] / after[name]:.1f}")
+
+        await close_pool()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--broadcasts", type=int, default=500)
+    parser.add_argument("--confirmations", type=int, default=1000, help="подтверждений на одну рассылку")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.users, args.broadcasts, args.confirmations, args.repeats))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Замер пропускной способности приема обновлений по вебхуку
+
+Поднимает локальный сервер вебхука с простым обработчиком и отправляет на него
+синтетические обновления. Ответы 503 повторяются, как это делает Telegram, поэтому
+в конце проверяется, что обработано ровно столько обновлений, сколько отправлено.
+
+Запуск из корня проекта: python -m benchmarks.bench_webhook
+"""
+import argparse
+import asyncio
+import time
+import aiohttp
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+from config import WEBHOOK_PATH
+from utils.update_workers import UpdateWorkers
+from utils.webhook_server import WebhookServer, SECRET_HEADER
+
+SECRET = "benchmark-secret"
+
+def make_update(update_id, user_id):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Test"},
+            "text": "ping",
+        },
+    }
+
+async def run(updates, users, clients, workers, queue_size, handler_latency, port):
+    bot = Bot("123456:TEST")
+    dp = Dispatcher()
+    handled = []
+
+    @dp.message()
+    async def handler(message: Message):
+        if handler_latency:
+            await asyncio.sleep(handler_latency)
+        handled.append(message.message_id)
+
+    async def process(update):
+        await dp.feed_raw_update(bot, update)
+
+    server = WebhookServer(UpdateWorkers(process, workers, queue_size), secret=SECRET)
+    runner = web.AppRunner(server.create_app())
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+
+    url = f"http://127.0.0.1:{port}{WEBHOOK_PATH}"
+    pending = asyncio.Queue()
+    for update_id in range(1, updates + 1):
+        pending.put_nowait(make_update(update_id, update_id % users + 1))
+
+    async def client(session):
+        while not pending.empty():
+            update = pending.get_nowait()
+            while True:
+                async with session.post(url, json=update, headers={SECRET_HEADER: SECRET}) as response:
+                    if response.status == 200:
+                        break
+                # Telegram повторяет доставку после неуспешного ответа
+                await asyncio.sleep(0.01)
+
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, json=make_update(0, 1)) as response:
+            unauthorized = response.status
+
+        started = time.monotonic()
+        await asyncio.gather(*(client(session) for _ in range(clients)))
+        accepted = time.monotonic() - started
+
+    await runner.cleanup()
+    elapsed = time.monotonic() - started
+    await bot.session.close()
+
+    print(f"Обновлений: {updates}, клиентов: {clients}, обработчиков: {workers}, очередь: {queue_size}")
+    print(f"Запрос без секрета отклонен со статусом {unauthorized}")
+    print(f"Принято за {accepted:.2f} с ({updates / accepted:.0f}/с), обработано за {elapsed:.2f} с ({len(handled) / elapsed:.0f}/с)")
+    print(f"Ответов 503 (повторено клиентом): {server.rejected}")
+    print(f"Обработано: {len(handled)}, потеряно: {updates - len(set(handled))}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--queue-size", type=int, default=100)
+    parser.add_argument("--handler-latency", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+    asyncio.run(run(args.updates, args.users, args.clients, args.workers, args.queue_size, args.handler_latency, args.port))
+
+if __name__ == "__main__":
+    main()
@@ -1,58 +1,122 @@
 import asyncio
 import logging
 import os
-import sys
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.client.default import DefaultBotProperties
 
-from config import BOT_TOKEN
+from config import BOT_TOKEN, BOT_MODE, BOT_ROLE
 from handlers import register_admin_handlers, register_user_handlers
-from middlewares import RoleMiddleware
-from database import setup_database
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler("bot_log.log")
-    ]
-)
+from middlewares import RoleMiddleware, HeartbeatMiddleware
+from database import setup_database, close_database, SQLiteStorage
+from utils.admin_cache import admin_cache
+from utils.broadcast_jobs import broadcast_jobs
+from utils.confirmation_writer import confirmation_writer
+from utils.admin_digest import confirmation_digest
+from utils.heartbeat import heartbeat
+from utils.profile_refresher import profile_refresher
+from utils.logging_setup import setup_logging
+from utils.webhook_server import run_webhook, run_worker, require_webhook_secret
+from utils.update_router import run_receiver
 
 # Проверка наличия директории для базы данных
 os.makedirs("database", exist_ok=True)
 
+# Фоновые задачи и база уже остановлены (on_shutdown вызывается и диспетчером, и при выходе из main)
+_stopped = False
+
+async def on_shutdown():
+    """Остановка фоновых задач и закрытие базы данных до закрытия сессии бота"""
+    global _stopped
+    if _stopped:
+        return
+    _stopped = True
+    
+    await broadcast_jobs.shutdown()
+    await confirmation_digest.close()
+    await confirmation_writer.close()
+    await profile_refresher.close()
+    await close_database()
+    await heartbeat.close()
+
 async def main():
+    # Публичный вебхук принимает обновления только с секретным токеном: проверяем до запуска
+    if BOT_MODE == "webhook" and BOT_ROLE != "worker":
+        require_webhook_secret()
+    
     # Инициализация бота и диспетчера
     bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN))
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
     
-    # Настройка базы данных
-    await setup_database()
+    # Запись пульса процесса для супервизора
+    heartbeat.start()
+    
+    try:
+        # Процесс-приемник не работает с базой и только распределяет обновления между рабочими процессами
+        if BOT_ROLE == "receiver":
+            dp = Dispatcher()
+            register_admin_handlers(dp)
+            register_user_handlers(dp)
+            await run_receiver(bot, dp.resolve_used_update_types())
+            return
+    
+        storage = SQLiteStorage()
+        dp = Dispatcher(storage=storage)
     
-    # Регистрация middleware
-    dp.message.middleware(RoleMiddleware())
-    dp.callback_query.middleware(RoleMiddleware())
+        # Настройка базы данных и очистка устаревших состояний FSM
+        await setup_database()
+        await storage.purge_expired()
     
-    # Регистрация обработчиков
-    register_admin_handlers(dp)
-    register_user_handlers(dp)
+        # Загрузка кэша администраторов, запуск пакетной записи подтверждений, профилей и сводок для админа
+        await admin_cache.load()
+        confirmation_writer.start()
+        profile_refresher.start()
+        confirmation_digest.start(bot)
     
-    # Вывод информации о запуске бота
-    bot_info = await bot.get_me()
-    logging.info(f"Бот {bot_info.full_name} (@{bot_info.username}) успешно запущен!")
+        # Действия при запуске и остановке бота
+        dp.startup.register(heartbeat.mark_serving)
+        dp.shutdown.register(on_shutdown)
     
-    # Удаление вебхука на всякий случай
-    await bot.delete_webhook(drop_pending_updates=True)
+        # Регистрация middleware
+        dp.update.outer_middleware(HeartbeatMiddleware())
+        dp.message.middleware(RoleMiddleware())
+        dp.callback_query.middleware(RoleMiddleware())
     
-    # Запуск поллинга
-    await dp.start_polling(bot)
+        # Регистрация обработчиков
+        register_admin_handlers(dp)
+        register_user_handlers(dp)
+    
+        # Вывод информации о запуске бота
+        bot_info = await bot.get_me()
+        logging.info(f"Бот {bot_info.full_name} (@{bot_info.username}) успешно запущен!")
+    
+        # Продолжение рассылок, прерванных предыдущим запуском (каждую продолжает процесс ее автора)
+        await broadcast_jobs.resume_unfinished(bot)
+    
+        # Рабочий процесс получает обновления своей части пользователей от приемника
+        if BOT_ROLE == "worker":
+            await run_worker(bot, dp)
+            return
+    
+        # Запуск в режиме вебхука
+        if BOT_MODE == "webhook":
+            await run_webhook(bot, dp)
+            return
+    
+        # Удаление вебхука; накопившиеся обновления не сбрасываются и будут получены поллингом
+        await bot.delete_webhook(drop_pending_updates=False)
+    
+        # Запуск поллинга
+        await dp.start_polling(bot)
+    finally:
+        # При сбое запуска dp.shutdown не вызывается, а незакрытый пул соединений
+        # (потоки aiosqlite) не дал бы процессу завершиться
+        await on_shutdown()
+        await bot.session.close()
 
 if __name__ == "__main__":
+    # Настройка логирования: запись в файл и консоль выполняется в отдельном потоке
+    setup_logging()
+    
     try:
         asyncio.run(main())
     except (KeyboardInterrupt, SystemExit):
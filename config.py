@@ -11,4 +11,130 @@ BOT_TOKEN = os.getenv("BOT_TOKEN")
 ADMIN_ID = int(os.getenv("ADMIN_ID", 0))
 
 # Путь к файлу базы данных
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'bot_database.db')
\ No newline at end of file
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'bot_database.db')
+
+# Размер пула соединений с базой данных
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 4))
+
+# Размер кэша подготовленных выражений на одно соединение
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 256))
+
+# Время жизни кэша администраторов в секундах
+ADMIN_CACHE_TTL = int(os.getenv("ADMIN_CACHE_TTL", 300))
+
+# Общий лимит отправки сообщений в секунду (Telegram допускает около 30)
+BROADCAST_RATE_LIMIT = float(os.getenv("BROADCAST_RATE_LIMIT", 25))
+
+# Лимит сообщений в секунду для одного чата
+BROADCAST_CHAT_RATE_LIMIT = float(os.getenv("BROADCAST_CHAT_RATE_LIMIT", 1))
+
+# Количество одновременных отправок при рассылке
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", 20))
+
+# Количество повторных попыток при временных ошибках
+BROADCAST_MAX_RETRIES = int(os.getenv("BROADCAST_MAX_RETRIES", 5))
+
+# Интервал обновления сообщения о ходе рассылки в секундах
+BROADCAST_PROGRESS_INTERVAL = float(os.getenv("BROADCAST_PROGRESS_INTERVAL", 5))
+
+# Размер пакета записи результатов доставки
+DELIVERY_BATCH_SIZE = int(os.getenv("DELIVERY_BATCH_SIZE", 200))
+
+# Максимальный интервал между записями результатов доставки в секундах
+DELIVERY_FLUSH_INTERVAL = float(os.getenv("DELIVERY_FLUSH_INTERVAL", 1))
+
+# Интервал пакетной записи подтверждений в миллисекундах
+CONFIRM_FLUSH_INTERVAL_MS = int(os.getenv("CONFIRM_FLUSH_INTERVAL_MS", 200))
+
+# Количество подтверждений, после которого запись выполняется сразу
+CONFIRM_BATCH_SIZE = int(os.getenv("CONFIRM_BATCH_SIZE", 500))
+
+# Интервал отправки администратору сводки новых подтверждений в секундах
+ADMIN_DIGEST_INTERVAL = float(os.getenv("ADMIN_DIGEST_INTERVAL", 30))
+
+# Количество записей на одной странице списков пользователей
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", 50))
+
+# Максимальное время жизни кэша кодовых фраз в секундах
+# (ограничивает устаревание, если фразы изменил другой процесс)
+CODE_PHRASES_CACHE_TTL = int(os.getenv("CODE_PHRASES_CACHE_TTL", 60))
+
+# Время жизни записи кэша сообщений в секундах
+# (статус кодовой фразы, измененный в другом рабочем процессе, виден не позже чем через это время)
+MESSAGE_CACHE_TTL = int(os.getenv("MESSAGE_CACHE_TTL", 60))
+
+# Количество кодовых фраз на одной странице управления
+CODE_PHRASES_PAGE_SIZE = int(os.getenv("CODE_PHRASES_PAGE_SIZE", 8))
+
+# Режим получения обновлений: "polling" или "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+
+# Публичный адрес сервера для вебхука (например, https://example.com)
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")
+
+# Путь, по которому Telegram отправляет обновления
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+
+# Секретный токен для проверки заголовка X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+
+# Адрес и порт локального HTTP-сервера вебхука
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+
+# Количество параллельных обработчиков обновлений
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", 8))
+
+# Размер очереди обновлений одного обработчика (при переполнении Telegram повторит доставку)
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", 100))
+
+# Время жизни незавершенного состояния FSM в секундах (например, начатой рассылки)
+FSM_STATE_TTL = int(os.getenv("FSM_STATE_TTL", 86400))
+
+# Количество ключей FSM, хранимых в памяти
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", 10000))
+
+# Количество рабочих процессов; при значении больше 1 пользователи делятся между процессами по user_id % BOT_WORKERS
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", 1))
+
+# Роль процесса: "single" - обычный запуск, "receiver" - прием и распределение обновлений, "worker" - обработка
+BOT_ROLE = os.getenv("BOT_ROLE", "single")
+
+# Номер рабочего процесса и порт, на котором рабочий процесс с номером 0 принимает обновления
+WORKER_INDEX = int(os.getenv("WORKER_INDEX", 0))
+WORKER_BASE_PORT = int(os.getenv("WORKER_BASE_PORT", 8100))
+
+# Секрет для передачи обновлений от приемника рабочим процессам (задается супервизором)
+SHARD_SECRET = os.getenv("SHARD_SECRET", "")
+
+# Каталог файлов пульса процессов бота и интервал их обновления в секундах
+HEARTBEAT_DIR = os.getenv("HEARTBEAT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run'))
+HEARTBEAT_INTERVAL = int(os.getenv("HEARTBEAT_INTERVAL", 5))
+
+# Через сколько секунд без пульса супервизор считает процесс зависшим
+HEARTBEAT_TIMEOUT = int(os.getenv("HEARTBEAT_TIMEOUT", 60))
+
+# Пауза перед перезапуском: начальная и максимальная (растет экспоненциально при повторных сбоях)
+RESTART_BACKOFF_BASE = float(os.getenv("RESTART_BACKOFF_BASE", 1))
+RESTART_BACKOFF_MAX = float(os.getenv("RESTART_BACKOFF_MAX", 300))
+
+# Сколько секунд бот должен проработать, чтобы счетчик подряд идущих сбоев сбросился
+RESTART_RESET_AFTER = int(os.getenv("RESTART_RESET_AFTER", 120))
+
+# Порт HTTP-эндпоинта /health супервизора на 127.0.0.1 (0 - не запускать)
+SUPERVISOR_HEALTH_PORT = int(os.getenv("SUPERVISOR_HEALTH_PORT", 0))
+
+# Файл лога бота, его максимальный размер в байтах и количество архивных файлов при ротации
+LOG_FILE = os.getenv("LOG_FILE", "bot_log.log")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+
+# Уровень логирования
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+# Количество клавиатур с параметрами, хранимых в памяти
+KEYBOARD_CACHE_SIZE = int(os.getenv("KEYBOARD_CACHE_SIZE", 512))
+
+# Интервал записи изменившихся имен пользователей в секундах и количество отслеживаемых профилей
+PROFILE_FLUSH_INTERVAL = int(os.getenv("PROFILE_FLUSH_INTERVAL", 30))
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", 10000))
\ No newline at end of file
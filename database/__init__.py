@@ -1,3 +1,4 @@
-from .db_operations import setup_database
+from .db_operations import setup_database, close_database
+from .fsm_storage import SQLiteStorage
 
-__all__ = ['setup_database']
\ No newline at end of file
+__all__ = ['setup_database', 'close_database', 'SQLiteStorage']
\ No newline at end of file
@@ -0,0 +1,15 @@
+"""Применение миграций базы данных без запуска бота
+
+Запуск из корня проекта: python -m database
+"""
+import asyncio
+import logging
+from database.db_operations import setup_database, close_database
+
+async def main():
+    await setup_database()
+    await close_database()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(main())
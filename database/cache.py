@@ -0,0 +1,51 @@
+import time
+from collections import OrderedDict
+
+class LRUCache:
+    """Простой LRU-кэш со счетчиками попаданий и промахов
+
+    При заданном ttl (в секундах) запись считается отсутствующей, когда ее время жизни истекло.
+    """
+
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # key -> (значение, момент истечения или None)
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        if key in self._data:
+            value, expires_at = self._data[key]
+            if expires_at is None or time.monotonic() < expires_at:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+
+        self.misses += 1
+        return default
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        """Счетчики попаданий и промахов кэша"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
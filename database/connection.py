@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+import aiosqlite
+from config import DB_PATH, DB_POOL_SIZE, DB_STATEMENT_CACHE_SIZE
+
+# Настройки, применяемые к каждому соединению пула
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+)
+
+class ConnectionPool:
+    """Пул долгоживущих соединений с SQLite"""
+
+    def __init__(self, db_path, size=DB_POOL_SIZE, cached_statements=DB_STATEMENT_CACHE_SIZE):
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.cached_statements = cached_statements
+        self._connections = []
+        self._idle = asyncio.Queue()
+
+    async def open(self):
+        """Открывает соединения пула и применяет настройки SQLite"""
+        for _ in range(self.size):
+            # cached_statements включает кэш подготовленных выражений sqlite3
+            db = await aiosqlite.connect(self.db_path, cached_statements=self.cached_statements)
+            db.row_factory = aiosqlite.Row
+            for pragma in CONNECTION_PRAGMAS:
+                await db.execute(pragma)
+            self._connections.append(db)
+            self._idle.put_nowait(db)
+
+        logging.info(f"Открыт пул соединений с базой данных ({self.size} шт.)")
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Выдает свободное соединение из пула на время блока"""
+        db = await self._idle.get()
+        try:
+            yield db
+        finally:
+            # Незавершенная транзакция не должна достаться следующему владельцу
+            if db.in_transaction:
+                await db.rollback()
+            self._idle.put_nowait(db)
+
+    async def close(self):
+        """Закрывает все соединения пула"""
+        for db in self._connections:
+            await db.close()
+        self._connections.clear()
+        self._idle = asyncio.Queue()
+        logging.info("Пул соединений с базой данных закрыт")
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+async def init_pool(db_path=DB_PATH):
+    """Создает пул соединений, если он еще не создан"""
+    global _pool
+
+    async with _pool_lock:
+        if _pool is None:
+            pool = ConnectionPool(db_path)
+            await pool.open()
+            _pool = pool
+
+    return _pool
+
+async def close_pool():
+    """Закрывает пул соединений"""
+    global _pool
+
+    async with _pool_lock:
+        if _pool is not None:
+            await _pool.close()
+            _pool = None
+
+@asynccontextmanager
+async def get_connection():
+    """Соединение из общего пула (пул создается при первом обращении)"""
+    pool = _pool or await init_pool()
+    async with pool.acquire() as db:
+        yield db
@@ -1,70 +1,85 @@
-import aiosqlite
+import json
 import logging
 from datetime import datetime
-from config import DB_PATH
+from config import MESSAGE_CACHE_TTL
+from database.connection import init_pool, close_pool, get_connection
+from database.migrations import run_migrations
+from database.cache import LRUCache
+
+# Кэш сообщений для обработки подтверждений (ключ - ID сообщения). Смена статуса сбрасывает запись
+# только в своем процессе, поэтому время жизни записи ограничено
+_message_cache = LRUCache(maxsize=256, ttl=MESSAGE_CACHE_TTL)
+
+# Версия списка кодовых фраз, увеличивается при каждом его изменении
+_code_phrases_version = 0
+
+def get_code_phrases_version():
+    """Текущая версия списка кодовых фраз"""
+    return _code_phrases_version
+
+def _bump_code_phrases_version():
+    global _code_phrases_version
+    _code_phrases_version += 1
 
 async def setup_database():
     """Создание и настройка базы данных"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY,
-            username TEXT,
-            first_name TEXT,
-            last_name TEXT,
-            joined_at TIMESTAMP,
-            is_admin INTEGER DEFAULT 0,
-            freebilet_confirmed INTEGER DEFAULT 0
-        )
-        ''')
-        
-        await db.execute('''
-        CREATE TABLE IF NOT EXISTS messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            message_text TEXT,
-            sent_at TIMESTAMP,
-            sender_id INTEGER,
-            is_code_phrase INTEGER DEFAULT 0,
-            status TEXT DEFAULT 'active', -- 'active', 'outdated', 'deleted'
-            FOREIGN KEY (sender_id) REFERENCES users(user_id)
-        )
-        ''')
-        
-        await db.execute('''
-        CREATE TABLE IF NOT EXISTS confirmations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            message_id INTEGER,
-            user_id INTEGER,
-            confirmed_at TIMESTAMP,
-            FOREIGN KEY (message_id) REFERENCES messages(id),
-            FOREIGN KEY (user_id) REFERENCES users(user_id)
-        )
-        ''')
-        
-        await db.commit()
-        logging.info("База данных настроена")
+    await init_pool()
+    
+    async with get_connection() as db:
+        version = await run_migrations(db)
+        logging.info(f"База данных настроена (версия схемы {version})")
 
 async def register_user(user_id, username, first_name, last_name, is_admin=0, freebilet_confirmed=0):
-    """Регистрация пользователя в базе данных"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        # Проверка наличия пользователя
-        cursor = await db.execute("SELECT user_id, freebilet_confirmed FROM users WHERE user_id = ?", (user_id,))
-        user = await cursor.fetchone()
-        
-        if not user:
-            await db.execute(
-                "INSERT INTO users (user_id, username, first_name, last_name, joined_at, is_admin, freebilet_confirmed) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                (user_id, username, first_name, last_name, datetime.now(), is_admin, freebilet_confirmed)
-            )
-            await db.commit()
-            logging.info(f"Зарегистрирован новый пользователь: {username} ({user_id})")
-            return True, freebilet_confirmed
-        else:
-            return False, user[1]
+    """Регистрация пользователя или обновление его профиля одним запросом
+
+    Возвращает признак нового пользователя и статус подтверждения регистрации в freebilet.
+    """
+    joined_at = datetime.now()
+    async with get_connection() as db:
+        cursor = await db.execute(
+            """
+            INSERT INTO users (user_id, username, first_name, last_name, joined_at, is_admin, freebilet_confirmed)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET
+                username = excluded.username,
+                first_name = excluded.first_name,
+                last_name = excluded.last_name,
+                is_admin = MAX(users.is_admin, excluded.is_admin),
+                -- Пользователь снова написал боту, значит, сообщения ему снова доставляются
+                delivery_state_at = CASE WHEN users.delivery_state != 'active' THEN excluded.joined_at ELSE users.delivery_state_at END,
+                delivery_state = 'active'
+            RETURNING joined_at, freebilet_confirmed
+            """,
+            (user_id, username, first_name, last_name, joined_at, is_admin, freebilet_confirmed)
+        )
+        row = await cursor.fetchone()
+        await db.commit()
+    
+    # У существующего пользователя сохраняется прежняя дата регистрации
+    is_new = row[0] == joined_at.isoformat(" ")
+    if is_new:
+        logging.info(f"Зарегистрирован новый пользователь: {username} ({user_id})")
+    return is_new, row[1]
+
+async def update_user_profiles(profiles):
+    """Пакетное обновление имен пользователей: [(user_id, username, first_name, last_name), ...]
+
+    Незарегистрированные пользователи не добавляются, неизменившиеся строки не перезаписываются.
+    """
+    async with get_connection() as db:
+        await db.executemany(
+            """
+            UPDATE users SET username = ?2, first_name = ?3, last_name = ?4
+            WHERE user_id = ?1
+                AND (username IS NOT ?2 OR first_name IS NOT ?3 OR last_name IS NOT ?4)
+            """,
+            profiles
+        )
+        await db.commit()
 
 async def update_freebilet_status(user_id, confirmed):
     """Обновление статуса подтверждения регистрации в freebilet"""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with get_connection() as db:
         await db.execute(
             "UPDATE users SET freebilet_confirmed = ? WHERE user_id = ?",
             (1 if confirmed else 0, user_id)
@@ -72,85 +87,305 @@ async def update_freebilet_status(user_id, confirmed):
         await db.commit()
         return True
 
-async def get_all_users():
-    """Получение списка всех пользователей"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM users WHERE is_admin = 0")
-        users = await cursor.fetchall()
-        return [dict(user) for user in users]
+async def set_users_delivery_state(users):
+    """Пакетная смена состояния доставки пользователей: [(user_id, state), ...]"""
+    now = datetime.now()
+    async with get_connection() as db:
+        await db.executemany(
+            "UPDATE users SET delivery_state = ?, delivery_state_at = ? WHERE user_id = ? AND delivery_state != ?",
+            [(state, now, user_id, state) for user_id, state in users]
+        )
+        await db.commit()
+
+async def count_users():
+    """Количество пользователей, получающих рассылки, и пользователей, которым сообщения не доставляются"""
+    async with get_connection() as db:
+        cursor = await db.execute(
+            "SELECT SUM(delivery_state = 'active'), SUM(delivery_state != 'active') FROM users WHERE is_admin = 0"
+        )
+        row = await cursor.fetchone()
+        return row[0] or 0, row[1] or 0
+
+async def _fetch_keyset_page(query, params, cursor, backward, limit):
+    """Страница выборки по ключу user_id: после cursor или (backward=True) перед ним
+
+    В query подставляются условие {cond} и направление сортировки {order}.
+    Возвращает строки страницы и признак того, что дальше в этом направлении есть еще строки.
+    """
+    sql = query.format(
+        cond="user_id < ?" if backward else "user_id > ?",
+        order="DESC" if backward else "ASC"
+    )
+    async with get_connection() as db:
+        db_cursor = await db.execute(sql, (*params, cursor, limit + 1))
+        rows = await db_cursor.fetchall()
+    
+    has_more = len(rows) > limit
+    rows = [dict(row) for row in rows[:limit]]
+    if backward:
+        rows.reverse()
+    return rows, has_more
+
+async def _keyset_page(query, params, cursor, backward, limit):
+    """Страница выборки с признаками наличия предыдущей и следующей страниц"""
+    rows, has_more = await _fetch_keyset_page(query, params, cursor, backward, limit)
+    
+    if backward:
+        return rows, has_more, True
+    return rows, cursor > 0, has_more
+
+async def get_users_page(cursor=0, backward=False, limit=50):
+    """Страница списка пользователей (keyset-пагинация по user_id)"""
+    return await _keyset_page(
+        "SELECT * FROM users WHERE is_admin = 0 AND {cond} ORDER BY user_id {order} LIMIT ?",
+        (), cursor, backward, limit
+    )
 
 async def get_freebilet_users(confirmed=True):
     """Получение списка пользователей с подтвержденной/неподтвержденной регистрацией в freebilet"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with get_connection() as db:
         cursor = await db.execute(
-            "SELECT * FROM users WHERE is_admin = 0 AND freebilet_confirmed = ?", 
+            "SELECT * FROM users WHERE is_admin = 0 AND delivery_state = 'active' AND freebilet_confirmed = ?", 
             (1 if confirmed else 0,)
         )
         users = await cursor.fetchall()
         return [dict(user) for user in users]
 
-async def check_admin(user_id):
-    """Проверка, является ли пользователь администратором"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute("SELECT is_admin FROM users WHERE user_id = ?", (user_id,))
-        result = await cursor.fetchone()
+async def get_admin_ids():
+    """Получение ID всех администраторов"""
+    async with get_connection() as db:
+        cursor = await db.execute("SELECT user_id FROM users WHERE is_admin = 1")
+        rows = await cursor.fetchall()
+        return {row[0] for row in rows}
+
+# Сегменты аудитории рассылки: источник строк (таблица users u или ведущая выборка, соединенная с ней)
+# и условие, в которые подставляется значение сегмента. К условию всегда добавляется
+# is_admin = 0 AND delivery_state = 'active'. CROSS JOIN закрепляет порядок соединения в SQLite,
+# чтобы выборка шла от короткого списка, а не перебором всех пользователей
+AUDIENCE_SEGMENTS = {
+    # Все пользователи
+    "all": ("users u", "1"),
+    # Подтвердившие (1) или не подтвердившие (0) регистрацию в freebilet: idx_users_audience
+    "freebilet": ("users u", "u.freebilet_confirmed = ?"),
+    # Зарегистрировавшиеся в боте начиная с даты 'ГГГГ-ММ-ДД': idx_users_audience_joined
+    "joined_after": ("users u", "u.joined_at >= ?"),
+    # Получатели сообщения с указанным ID, которым оно было отправлено или не дошло из-за временной ошибки,
+    # и которые его не подтвердили: idx_deliveries_state и idx_confirmations_message_user
+    "unconfirmed": (
+        "deliveries d CROSS JOIN users u ON u.user_id = d.user_id",
+        """d.message_id = ?1 AND d.state IN ('sent', 'failed') AND NOT EXISTS (
+            SELECT 1 FROM confirmations c WHERE c.message_id = ?1 AND c.user_id = d.user_id
+        )"""
+    ),
+    # Явный список ID пользователей: поиск по первичному ключу
+    "ids": ("json_each(?) j CROSS JOIN users u ON u.user_id = j.value", "1"),
+}
+
+def _audience_query(select, audience):
+    """SQL-запрос к аудитории рассылки и его параметры
+
+    audience - пара (сегмент, значение), например ("freebilet", 1) или ("ids", [1, 2, 3]);
+    None означает всех пользователей.
+    """
+    kind, value = audience or ("all", None)
+    if kind not in AUDIENCE_SEGMENTS:
+        raise ValueError(f"Неизвестный сегмент аудитории: {kind}")
+    
+    params = ()
+    if kind == "ids":
+        # Повторы убираются, иначе один пользователь попал бы в рассылку дважды
+        params = (json.dumps(sorted({int(user_id) for user_id in value})),)
+    elif kind != "all":
+        params = (value,)
+    
+    source, condition = AUDIENCE_SEGMENTS[kind]
+    sql = (
+        f"SELECT {select} FROM {source} "
+        f"WHERE u.is_admin = 0 AND u.delivery_state = 'active' AND {condition}"
+    )
+    return sql, params
+
+async def count_audience(audience=None):
+    """Количество получателей рассылки в сегменте аудитории"""
+    sql, params = _audience_query("COUNT(*)", audience)
+    async with get_connection() as db:
+        cursor = await db.execute(sql, params)
+        return (await cursor.fetchone())[0]
+
+async def save_broadcast_message(message_text, sender_id, is_code_phrase=0, audience=None, resend_of=None):
+    """Сохранение сообщения для рассылки и списка его получателей в базу данных
+
+    Получатели выбираются из сегмента audience (см. AUDIENCE_SEGMENTS) одним запросом
+    INSERT ... SELECT, без загрузки пользователей в память. resend_of - ID исходного сообщения
+    для повторной рассылки: подтверждения повтора засчитываются и ему.
+    """
+    async with get_connection() as db:
+        cursor = await db.execute(
+            "INSERT INTO messages (message_text, sent_at, sender_id, is_code_phrase, resend_of) VALUES (?, ?, ?, ?, ?)",
+            (message_text, datetime.now(), sender_id, is_code_phrase, resend_of)
+        )
+        message_id = cursor.lastrowid
+        
+        # Получатели фиксируются в той же транзакции, чтобы рассылку можно было продолжить после сбоя.
+        # ID сообщения (целое из lastrowid) подставляется в текст запроса, параметры остаются за сегментом
+        sql, params = _audience_query(f"{int(message_id)}, u.user_id", audience)
+        await db.execute(f"INSERT INTO deliveries (message_id, user_id) {sql}", params)
+        await db.commit()
+    
+    if is_code_phrase:
+        _bump_code_phrases_version()
+    return message_id
+
+async def iter_pending_deliveries(message_id, batch_size=500):
+    """Постраничный обход получателей, которым сообщение еще не отправлено"""
+    last_user_id = 0
+    
+    while True:
+        # Соединение берется только на время чтения страницы, а не на всю рассылку
+        async with get_connection() as db:
+            cursor = await db.execute(
+                """
+                SELECT user_id FROM deliveries
+                WHERE message_id = ? AND state = 'pending' AND user_id > ?
+                ORDER BY user_id
+                LIMIT ?
+                """,
+                (message_id, last_user_id, batch_size)
+            )
+            rows = await cursor.fetchall()
         
-        if result is None:
-            return False
+        if not rows:
+            return
         
-        return bool(result[0])
+        for row in rows:
+            yield row[0]
+        last_user_id = rows[-1][0]
 
-async def save_broadcast_message(message_text, sender_id, is_code_phrase=0):
-    """Сохранение сообщения для рассылки в базу данных"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute(
-            "INSERT INTO messages (message_text, sent_at, sender_id, is_code_phrase) VALUES (?, ?, ?, ?)",
-            (message_text, datetime.now(), sender_id, is_code_phrase)
+async def update_delivery_states(message_id, results):
+    """Пакетное сохранение результатов отправки: [(user_id, state, tg_message_id), ...]"""
+    now = datetime.now()
+    async with get_connection() as db:
+        await db.executemany(
+            "UPDATE deliveries SET state = ?, tg_message_id = ?, updated_at = ? WHERE message_id = ? AND user_id = ?",
+            [(state, tg_message_id, now, message_id, user_id) for user_id, state, tg_message_id in results]
+        )
+        await db.commit()
+
+async def cancel_pending_deliveries(message_id):
+    """Отмена неотправленных сообщений рассылки"""
+    async with get_connection() as db:
+        await db.execute(
+            "UPDATE deliveries SET state = 'cancelled', updated_at = ? WHERE message_id = ? AND state = 'pending'",
+            (datetime.now(), message_id)
         )
         await db.commit()
-        return cursor.lastrowid
 
-async def register_confirmation(message_id, user_id):
-    """Регистрация подтверждения получения сообщения"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        # Проверяем, не подтверждал ли пользователь уже это сообщение
+async def get_delivery_counts(message_id):
+    """Количество получателей рассылки по состояниям доставки"""
+    async with get_connection() as db:
         cursor = await db.execute(
-            "SELECT id FROM confirmations WHERE message_id = ? AND user_id = ?",
-            (message_id, user_id)
+            "SELECT state, COUNT(*) FROM deliveries WHERE message_id = ? GROUP BY state",
+            (message_id,)
         )
-        existing = await cursor.fetchone()
-        
-        if not existing:
-            await db.execute(
-                "INSERT INTO confirmations (message_id, user_id, confirmed_at) VALUES (?, ?, ?)",
-                (message_id, user_id, datetime.now())
+        rows = await cursor.fetchall()
+        return {state: count for state, count in rows}
+
+async def get_unfinished_broadcasts():
+    """Получение рассылок, у которых остались неотправленные сообщения"""
+    async with get_connection() as db:
+        cursor = await db.execute(
+            """
+            SELECT m.*
+            FROM messages m
+            WHERE EXISTS (
+                SELECT 1 FROM deliveries d
+                WHERE d.message_id = m.id AND d.state = 'pending'
             )
-            await db.commit()
-            return True
-        return False
+            ORDER BY m.id
+            """
+        )
+        messages = await cursor.fetchall()
+        return [dict(message) for message in messages]
+
+async def get_confirmed_user_ids(message_id):
+    """Получение ID пользователей, подтвердивших сообщение"""
+    async with get_connection() as db:
+        cursor = await db.execute("SELECT user_id FROM confirmations WHERE message_id = ?", (message_id,))
+        rows = await cursor.fetchall()
+        return {row[0] for row in rows}
+
+async def save_confirmations(confirmations):
+    """Пакетная запись подтверждений одной транзакцией: [(message_id, user_id, confirmed_at), ...]"""
+    async with get_connection() as db:
+        await db.executemany(
+            """
+            INSERT INTO confirmations (message_id, user_id, confirmed_at) VALUES (?, ?, ?)
+            ON CONFLICT (message_id, user_id) DO NOTHING
+            """,
+            confirmations
+        )
+        await db.commit()
+
+async def get_broadcast_stats(message_id):
+    """Счетчики рассылки: получатели, доставлено, подтвердили"""
+    async with get_connection() as db:
+        cursor = await db.execute(
+            "SELECT recipients, delivered, confirmed FROM broadcast_stats WHERE message_id = ?",
+            (message_id,)
+        )
+        stats = await cursor.fetchone()
+        return dict(stats) if stats else None
+
+async def get_confirmation_counts(workers=1, index=0):
+    """Счетчики подтвержденных рассылок, авторы которых принадлежат процессу (sender_id % workers == index)
+
+    Повторные рассылки не возвращаются: их подтверждения засчитываются исходному сообщению
+    и учитываются в его счетчике.
+    """
+    async with get_connection() as db:
+        cursor = await db.execute(
+            """
+            SELECT s.message_id, m.sender_id, m.is_code_phrase, s.delivered, s.confirmed
+            FROM broadcast_stats s
+            JOIN messages m ON m.id = s.message_id
+            WHERE s.confirmed > 0 AND m.resend_of IS NULL AND m.sender_id % ? = ?
+            """,
+            (workers, index)
+        )
+        rows = await cursor.fetchall()
+        return [dict(row) for row in rows]
 
 async def get_message_by_id(message_id):
-    """Получение сообщения по ID"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    """Получение сообщения по ID (через кэш, сообщения меняются только при смене статуса)"""
+    message = _message_cache.get(message_id)
+    if message is not None:
+        return message
+    
+    async with get_connection() as db:
         cursor = await db.execute("SELECT * FROM messages WHERE id = ?", (message_id,))
         message = await cursor.fetchone()
-        return dict(message) if message else None
+    
+    if message is None:
+        return None
+    
+    message = dict(message)
+    _message_cache.set(message_id, message)
+    return message
+
+def get_message_cache_stats():
+    """Счетчики кэша сообщений"""
+    return _message_cache.stats()
 
 async def get_user_by_id(user_id):
     """Получение информации о пользователе по ID"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with get_connection() as db:
         cursor = await db.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
         user = await cursor.fetchone()
         return dict(user) if user else None
 
 async def get_confirmations_for_message(message_id):
     """Получение списка подтверждений для сообщения"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with get_connection() as db:
         cursor = await db.execute(
             """
             SELECT c.*, u.username, u.first_name, u.last_name
@@ -163,29 +398,114 @@ async def get_confirmations_for_message(message_id):
         confirmations = await cursor.fetchall()
         return [dict(confirmation) for confirmation in confirmations]
 
+async def get_confirmed_users_page(message_id, cursor=0, backward=False, limit=50):
+    """Страница пользователей, подтвердивших сообщение"""
+    return await _keyset_page(
+        """
+        SELECT c.user_id, u.username, u.first_name, u.last_name, c.confirmed_at
+        FROM confirmations c
+        JOIN users u ON c.user_id = u.user_id
+        WHERE c.message_id = ? AND c.{cond}
+        ORDER BY c.user_id {order}
+        LIMIT ?
+        """,
+        (message_id,), cursor, backward, limit
+    )
+
+# Пользователи, не подтвердившие сообщение ?1: его получатели из deliveries (тот же источник, что и у
+# сегмента "unconfirmed"). Для старых рассылок без записей о доставках получателями, как и раньше,
+# считаются все активные пользователи. Унарный плюс отключает индексы по state и is_admin:
+# обе ветки идут по первичному ключу в порядке user_id, и страница не сортируется целиком
+UNCONFIRMED_USERS_QUERY = """
+    SELECT d.user_id, u.username, u.first_name, u.last_name, u.joined_at, u.delivery_state
+    FROM deliveries d CROSS JOIN users u ON u.user_id = d.user_id
+    WHERE d.message_id = ?1 AND +d.state IN ('sent', 'failed') AND NOT EXISTS (
+        SELECT 1 FROM confirmations c WHERE c.message_id = ?1 AND c.user_id = d.user_id
+    )
+    UNION ALL
+    SELECT u.user_id, u.username, u.first_name, u.last_name, u.joined_at, u.delivery_state
+    FROM users u
+    WHERE NOT EXISTS (SELECT 1 FROM deliveries WHERE message_id = ?1)
+        AND +u.is_admin = 0 AND u.delivery_state = 'active' AND NOT EXISTS (
+            SELECT 1 FROM confirmations c WHERE c.message_id = ?1 AND c.user_id = u.user_id
+        )
+"""
+
+async def get_unconfirmed_users_page(message_id, cursor=0, backward=False, limit=50):
+    """Страница пользователей, не подтвердивших сообщение"""
+    return await _keyset_page(
+        f"SELECT * FROM ({UNCONFIRMED_USERS_QUERY}) WHERE {{cond}} ORDER BY user_id {{order}} LIMIT ?",
+        (message_id,), cursor, backward, limit
+    )
+
+async def count_unconfirmed_users(message_id):
+    """Количество пользователей, не подтвердивших сообщение (совпадает со списком get_unconfirmed_users_page)"""
+    async with get_connection() as db:
+        cursor = await db.execute(f"SELECT COUNT(*) FROM ({UNCONFIRMED_USERS_QUERY})", (message_id,))
+        return (await cursor.fetchone())[0]
+
+async def message_has_deliveries(message_id):
+    """Сохранен ли для сообщения список получателей (у рассылок до учета доставок его нет)"""
+    async with get_connection() as db:
+        cursor = await db.execute("SELECT EXISTS (SELECT 1 FROM deliveries WHERE message_id = ?)", (message_id,))
+        return bool((await cursor.fetchone())[0])
+
+# Запросы для выгрузки списков в файл: вид выгрузки -> (колонки, SQL, нужен ли ID сообщения)
+EXPORT_QUERIES = {
+    "users": (
+        ("user_id", "username", "first_name", "last_name", "joined_at", "freebilet_confirmed", "delivery_state"),
+        """
+        SELECT user_id, username, first_name, last_name, joined_at, freebilet_confirmed, delivery_state
+        FROM users
+        WHERE is_admin = 0
+        ORDER BY user_id
+        """,
+        False
+    ),
+    "confirmed": (
+        ("user_id", "username", "first_name", "last_name", "confirmed_at"),
+        """
+        SELECT c.user_id, u.username, u.first_name, u.last_name, c.confirmed_at
+        FROM confirmations c
+        JOIN users u ON c.user_id = u.user_id
+        WHERE c.message_id = ?
+        ORDER BY c.user_id
+        """,
+        True
+    ),
+    "unconfirmed": (
+        ("user_id", "username", "first_name", "last_name", "joined_at"),
+        f"""
+        SELECT user_id, username, first_name, last_name, joined_at
+        FROM ({UNCONFIRMED_USERS_QUERY})
+        ORDER BY user_id
+        """,
+        True
+    ),
+}
+
+async def iter_export_rows(kind, message_id=None, batch_size=1000):
+    """Потоковая выборка строк для выгрузки пачками по batch_size без загрузки всего списка"""
+    _, query, with_message = EXPORT_QUERIES[kind]
+    
+    async with get_connection() as db:
+        cursor = await db.execute(query, (message_id,) if with_message else ())
+        while True:
+            rows = await cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield [tuple(row) for row in rows]
+
 async def get_unconfirmed_users(message_id):
     """Получение списка пользователей, не подтвердивших сообщение"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
-            """
-            SELECT u.*
-            FROM users u
-            WHERE u.is_admin = 0 AND u.user_id NOT IN (
-                SELECT c.user_id
-                FROM confirmations c
-                WHERE c.message_id = ?
-            )
-            """,
-            (message_id,)
-        )
+    async with get_connection() as db:
+        cursor = await db.execute(UNCONFIRMED_USERS_QUERY, (message_id,))
         users = await cursor.fetchall()
         return [dict(user) for user in users]
 
 async def get_last_message():
     """Получение последнего отправленного сообщения"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with get_connection() as db:
         cursor = await db.execute(
             "SELECT * FROM messages ORDER BY id DESC LIMIT 1"
         )
@@ -194,20 +514,94 @@ async def get_last_message():
 
 async def get_all_code_phrases():
     """Получение всех кодовых фраз"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with get_connection() as db:
         cursor = await db.execute(
             "SELECT * FROM messages WHERE is_code_phrase = 1 AND status != 'deleted' ORDER BY id DESC"
         )
         messages = await cursor.fetchall()
         return [dict(message) for message in messages]
 
+async def get_code_phrases_page(page=0, limit=8):
+    """Страница кодовых фраз для управления и общее количество фраз"""
+    async with get_connection() as db:
+        cursor = await db.execute(
+            "SELECT COUNT(*) FROM messages WHERE is_code_phrase = 1 AND status != 'deleted'"
+        )
+        total = (await cursor.fetchone())[0]
+        
+        cursor = await db.execute(
+            """
+            SELECT id, message_text, status FROM messages
+            WHERE is_code_phrase = 1 AND status != 'deleted'
+            ORDER BY id DESC
+            LIMIT ? OFFSET ?
+            """,
+            (limit, page * limit)
+        )
+        phrases = await cursor.fetchall()
+        return [dict(phrase) for phrase in phrases], total
+
 async def update_code_phrase_status(message_id, status):
-    """Обновление статуса кодовой фразы"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            "UPDATE messages SET status = ? WHERE id = ?",
+    """Обновление статуса кодовой фразы
+
+    Проверка и изменение статуса выполняются одним запросом, удаленная фраза не восстанавливается.
+    Возвращает признак изменения и текущий статус фразы (None, если фраза не найдена).
+    """
+    async with get_connection() as db:
+        cursor = await db.execute(
+            """
+            UPDATE messages SET status = ?1
+            WHERE id = ?2 AND is_code_phrase = 1 AND status != ?1 AND status != 'deleted'
+            RETURNING status
+            """,
             (status, message_id)
         )
+        updated = await cursor.fetchone()
         await db.commit()
-        return True
\ No newline at end of file
+        
+        if updated is None:
+            cursor = await db.execute(
+                "SELECT status FROM messages WHERE id = ? AND is_code_phrase = 1", (message_id,)
+            )
+            row = await cursor.fetchone()
+            return False, row[0] if row else None
+    
+    _message_cache.pop(message_id)
+    _bump_code_phrases_version()
+    return True, status
+
+async def get_fsm_record(key, updated_after):
+    """Состояние, данные FSM (JSON) и время обновления по ключу, если запись обновлялась после updated_after"""
+    async with get_connection() as db:
+        cursor = await db.execute(
+            "SELECT state, data, updated_at FROM fsm_states WHERE key = ? AND updated_at > ?",
+            (key, updated_after)
+        )
+        row = await cursor.fetchone()
+        return (row[0], row[1], datetime.fromisoformat(row[2])) if row else None
+
+async def save_fsm_record(key, state, data):
+    """Запись состояния и данных FSM (JSON); пустая запись удаляется"""
+    async with get_connection() as db:
+        if state is None and data == "{}":
+            await db.execute("DELETE FROM fsm_states WHERE key = ?", (key,))
+        else:
+            await db.execute(
+                """
+                INSERT INTO fsm_states (key, state, data, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET state = excluded.state, data = excluded.data, updated_at = excluded.updated_at
+                """,
+                (key, state, data, datetime.now())
+            )
+        await db.commit()
+
+async def delete_expired_fsm_records(updated_before):
+    """Удаление записей FSM, не обновлявшихся с updated_before"""
+    async with get_connection() as db:
+        cursor = await db.execute("DELETE FROM fsm_states WHERE updated_at <= ?", (updated_before,))
+        await db.commit()
+        return cursor.rowcount
+
+async def close_database():
+    """Закрытие соединений с базой данных при остановке бота"""
+    await close_pool()
\ No newline at end of file
@@ -0,0 +1,81 @@
+import json
+import logging
+from copy import copy
+from datetime import datetime, timedelta
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder
+from config import FSM_STATE_TTL, FSM_CACHE_SIZE
+from database.cache import LRUCache
+from database.db_operations import get_fsm_record, save_fsm_record, delete_expired_fsm_records
+
+class SQLiteStorage(BaseStorage):
+    """Хранилище состояний FSM в SQLite с кэшем в памяти
+
+    Состояния переживают перезапуск бота. Чтение идет из кэша, в базу обращаемся только
+    при первом обращении к ключу (в том числе для ключей без состояния), запись сразу
+    сохраняется в базу. Состояния, не обновлявшиеся дольше ttl секунд, считаются сброшенными.
+    """
+
+    def __init__(self, ttl=FSM_STATE_TTL, cache_size=FSM_CACHE_SIZE):
+        self.ttl = timedelta(seconds=ttl)
+        self.key_builder = DefaultKeyBuilder(with_destiny=True)
+        # ключ -> [состояние, данные, момент истечения]
+        self._cache = LRUCache(maxsize=cache_size)
+
+    async def set_state(self, key, state=None):
+        storage_key = self.key_builder.build(key)
+        entry = await self._entry(storage_key)
+        entry[0] = state.state if isinstance(state, State) else state
+        await self._save(storage_key, entry)
+
+    async def get_state(self, key):
+        entry = await self._entry(self.key_builder.build(key))
+        return entry[0]
+
+    async def set_data(self, key, data):
+        storage_key = self.key_builder.build(key)
+        entry = await self._entry(storage_key)
+        entry[1] = copy(data)
+        await self._save(storage_key, entry)
+
+    async def get_data(self, key):
+        entry = await self._entry(self.key_builder.build(key))
+        return copy(entry[1])
+
+    async def purge_expired(self):
+        """Удаляет из базы устаревшие состояния"""
+        deleted = await delete_expired_fsm_records(datetime.now() - self.ttl)
+        if deleted:
+            logging.info(f"Удалено устаревших состояний FSM: {deleted}")
+
+    async def close(self):
+        # Записи сохраняются в базу сразу, закрывать соединения будет close_database
+        self._cache.clear()
+
+    def stats(self):
+        """Счетчики кэша состояний"""
+        return self._cache.stats()
+
+    async def _entry(self, key):
+        now = datetime.now()
+        entry = self._cache.get(key)
+        if entry is not None and entry[2] > now:
+            return entry
+
+        record = await get_fsm_record(key, now - self.ttl)
+        if record is None:
+            entry = [None, {}, now + self.ttl]
+        else:
+            state, data, updated_at = record
+            entry = [state, json.loads(data), updated_at + self.ttl]
+        self._cache.set(key, entry)
+        return entry
+
+    async def _save(self, key, entry):
+        entry[2] = datetime.now() + self.ttl
+        try:
+            await save_fsm_record(key, entry[0], json.dumps(entry[1], ensure_ascii=False))
+        except BaseException:
+            # Кэш не должен расходиться с базой: при следующем чтении запись загрузится заново
+            self._cache.pop(key)
+            raise
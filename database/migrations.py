@@ -0,0 +1,212 @@
+import logging
+
+# Миграции схемы базы данных: (версия, описание, SQL)
+# Текущая версия схемы хранится в PRAGMA user_version, каждая миграция выполняется в своей транзакции
+MIGRATIONS = [
+    (1, "Базовая схема", '''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            joined_at TIMESTAMP,
+            is_admin INTEGER DEFAULT 0,
+            freebilet_confirmed INTEGER DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_text TEXT,
+            sent_at TIMESTAMP,
+            sender_id INTEGER,
+            is_code_phrase INTEGER DEFAULT 0,
+            status TEXT DEFAULT 'active', -- 'active', 'outdated', 'deleted'
+            FOREIGN KEY (sender_id) REFERENCES users(user_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS confirmations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id INTEGER,
+            user_id INTEGER,
+            confirmed_at TIMESTAMP,
+            FOREIGN KEY (message_id) REFERENCES messages(id),
+            FOREIGN KEY (user_id) REFERENCES users(user_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS deliveries (
+            message_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            state TEXT NOT NULL DEFAULT 'pending', -- 'pending', 'sent', 'failed', 'blocked', 'cancelled'
+            tg_message_id INTEGER,
+            updated_at TIMESTAMP,
+            PRIMARY KEY (message_id, user_id),
+            FOREIGN KEY (message_id) REFERENCES messages(id),
+            FOREIGN KEY (user_id) REFERENCES users(user_id)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_deliveries_state ON deliveries (message_id, state, user_id);
+    '''),
+    (2, "Индексы для подтверждений, пользователей и кодовых фраз", '''
+        -- Повторные подтверждения могли появиться из-за гонки между SELECT и INSERT
+        DELETE FROM confirmations
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM confirmations GROUP BY message_id, user_id
+        );
+
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_confirmations_message_user ON confirmations (message_id, user_id);
+        CREATE INDEX IF NOT EXISTS idx_users_admin_freebilet ON users (is_admin, freebilet_confirmed);
+        CREATE INDEX IF NOT EXISTS idx_messages_code_phrase_status ON messages (is_code_phrase, status);
+    '''),
+    (3, "Счетчики статистики рассылок", '''
+        CREATE TABLE IF NOT EXISTS broadcast_stats (
+            message_id INTEGER PRIMARY KEY,
+            recipients INTEGER NOT NULL DEFAULT 0,
+            delivered INTEGER NOT NULL DEFAULT 0,
+            confirmed INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (message_id) REFERENCES messages(id)
+        );
+
+        -- Счетчики поддерживаются триггерами при записи доставок и подтверждений
+        CREATE TRIGGER IF NOT EXISTS trg_stats_message_insert AFTER INSERT ON messages
+        BEGIN
+            INSERT OR IGNORE INTO broadcast_stats (message_id) VALUES (NEW.id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_stats_delivery_insert AFTER INSERT ON deliveries
+        BEGIN
+            UPDATE broadcast_stats SET recipients = recipients + 1 WHERE message_id = NEW.message_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_stats_delivery_sent AFTER UPDATE OF state ON deliveries
+        WHEN NEW.state = 'sent' AND OLD.state != 'sent'
+        BEGIN
+            UPDATE broadcast_stats SET delivered = delivered + 1 WHERE message_id = NEW.message_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_stats_delivery_cancelled AFTER UPDATE OF state ON deliveries
+        WHEN NEW.state = 'cancelled' AND OLD.state != 'cancelled'
+        BEGIN
+            UPDATE broadcast_stats SET recipients = recipients - 1 WHERE message_id = NEW.message_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_stats_confirmation_insert AFTER INSERT ON confirmations
+        BEGIN
+            UPDATE broadcast_stats SET confirmed = confirmed + 1 WHERE message_id = NEW.message_id;
+        END;
+
+        -- Пересчет счетчиков по уже накопленным данным за один проход.
+        -- Для рассылок без таблицы доставок получателями считаются все пользователи, как и раньше
+        INSERT OR REPLACE INTO broadcast_stats (message_id, recipients, delivered, confirmed)
+        SELECT
+            m.id,
+            COALESCE(d.recipients, u.total),
+            COALESCE(d.delivered, u.total),
+            COALESCE(c.confirmed, 0)
+        FROM messages m
+        CROSS JOIN (SELECT COUNT(*) AS total FROM users WHERE is_admin = 0) u
+        LEFT JOIN (
+            SELECT message_id, SUM(state != 'cancelled') AS recipients, SUM(state = 'sent') AS delivered
+            FROM deliveries
+            GROUP BY message_id
+        ) d ON d.message_id = m.id
+        LEFT JOIN (
+            SELECT message_id, COUNT(*) AS confirmed
+            FROM confirmations
+            GROUP BY message_id
+        ) c ON c.message_id = m.id;
+    '''),
+    (4, "Хранилище состояний FSM", '''
+        CREATE TABLE IF NOT EXISTS fsm_states (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT NOT NULL DEFAULT '{}', -- JSON
+            updated_at TIMESTAMP NOT NULL
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_fsm_states_updated ON fsm_states (updated_at);
+    '''),
+    (5, "Состояние доставки пользователей", '''
+        ALTER TABLE users ADD COLUMN delivery_state TEXT NOT NULL DEFAULT 'active'; -- 'active', 'blocked', 'deactivated'
+        ALTER TABLE users ADD COLUMN delivery_state_at TIMESTAMP;
+
+        DROP INDEX IF EXISTS idx_users_admin_freebilet;
+        CREATE INDEX IF NOT EXISTS idx_users_audience ON users (is_admin, delivery_state, freebilet_confirmed);
+
+        -- Пользователи, заблокировавшие бота после последней успешной доставки
+        UPDATE users
+        SET delivery_state = 'blocked',
+            delivery_state_at = (
+                SELECT MAX(d.updated_at) FROM deliveries d
+                WHERE d.user_id = users.user_id AND d.state = 'blocked'
+            )
+        WHERE user_id IN (SELECT user_id FROM deliveries WHERE state = 'blocked')
+            AND NOT EXISTS (
+                SELECT 1 FROM deliveries d
+                WHERE d.user_id = users.user_id AND d.state = 'sent'
+                    AND d.updated_at > (
+                        SELECT MAX(b.updated_at) FROM deliveries b
+                        WHERE b.user_id = users.user_id AND b.state = 'blocked'
+                    )
+            );
+
+        -- Заблокировавшие бота не считаются получателями рассылки, как и отмененные доставки
+        CREATE TRIGGER IF NOT EXISTS trg_stats_delivery_blocked AFTER UPDATE OF state ON deliveries
+        WHEN NEW.state = 'blocked' AND OLD.state != 'blocked'
+        BEGIN
+            UPDATE broadcast_stats SET recipients = recipients - 1 WHERE message_id = NEW.message_id;
+        END;
+
+        UPDATE broadcast_stats
+        SET recipients = recipients - (
+            SELECT COUNT(*) FROM deliveries d
+            WHERE d.message_id = broadcast_stats.message_id AND d.state = 'blocked'
+        )
+        WHERE message_id IN (SELECT message_id FROM deliveries WHERE state = 'blocked');
+    '''),
+    (6, "Индекс для выбора аудитории по дате регистрации", '''
+        CREATE INDEX IF NOT EXISTS idx_users_audience_joined ON users (is_admin, delivery_state, joined_at);
+    '''),
+    (7, "Повторные рассылки не подтвердившим", '''
+        -- ID исходного сообщения, если рассылка - повтор для не подтвердивших его пользователей
+        ALTER TABLE messages ADD COLUMN resend_of INTEGER REFERENCES messages(id);
+
+        -- Подтверждение повтора засчитывается и исходному сообщению, поэтому следующий повтор
+        -- не уходит тем, кто уже подтвердил любой из предыдущих
+        CREATE TRIGGER IF NOT EXISTS trg_confirmation_resend AFTER INSERT ON confirmations
+        WHEN (SELECT resend_of FROM messages WHERE id = NEW.message_id) IS NOT NULL
+        BEGIN
+            INSERT OR IGNORE INTO confirmations (message_id, user_id, confirmed_at)
+            SELECT resend_of, NEW.user_id, NEW.confirmed_at FROM messages WHERE id = NEW.message_id;
+        END;
+    '''),
+]
+
+# Версия схемы, которую ожидает код бота
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+async def get_schema_version(db):
+    """Текущая версия схемы базы данных"""
+    cursor = await db.execute("PRAGMA user_version")
+    row = await cursor.fetchone()
+    return row[0]
+
+async def run_migrations(db, target_version=SCHEMA_VERSION):
+    """Последовательно применяет миграции до target_version"""
+    version = await get_schema_version(db)
+
+    for migration_version, description, script in MIGRATIONS:
+        if migration_version <= version or migration_version > target_version:
+            continue
+
+        # executescript не управляет транзакцией сам, поэтому BEGIN/COMMIT задаются явно
+        try:
+            await db.executescript(
+                f"BEGIN;\n{script}\nPRAGMA user_version = {migration_version};\nCOMMIT;"
+            )
+        except Exception:
+            await db.rollback()
+            raise
+        version = migration_version
+        logging.info(f"Применена миграция базы данных {migration_version}: {description}")
+
+    return version
@@ -1,22 +1,32 @@
 import logging
+import os
+import re
+from datetime import datetime
 from aiogram import Router, F
 from aiogram.filters import Command, StateFilter
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, FSInputFile
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import default_state
-from config import ADMIN_ID
+from config import ADMIN_ID, LIST_PAGE_SIZE, CODE_PHRASES_PAGE_SIZE
 from database.db_operations import (
-    get_all_users, save_broadcast_message, get_confirmations_for_message,
-    get_unconfirmed_users, get_last_message, register_user, get_user_by_id,
-    get_all_code_phrases, update_code_phrase_status, get_message_by_id
+    save_broadcast_message, get_last_message, register_user, get_user_by_id,
+    get_code_phrases_page, update_code_phrase_status, get_message_by_id,
+    get_message_cache_stats, get_broadcast_stats, count_users,
+    get_users_page, get_confirmed_users_page, get_unconfirmed_users_page, count_audience,
+    count_unconfirmed_users, message_has_deliveries
 )
 from keyboards.admin_keyboards import (
     admin_main_menu, admin_message_status, cancel_button, 
-    user_info_buttons, code_phrase_status_buttons
+    user_info_buttons, code_phrases_manager, broadcast_job_controls,
+    page_navigation, audience_choice, resend_confirmation
 )
+from keyboards.cache import get_keyboard_cache_stats
 from states.admin_states import AdminStates
-from utils.notifications import send_message_to_users
-from aiogram.exceptions import TelegramAPIError
+from utils.broadcast_jobs import broadcast_jobs
+from utils.csv_export import export_to_csv
+from utils.code_phrase_cache import code_phrase_cache
+from utils.admin_cache import admin_cache
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
 
 router = Router()
 
@@ -31,6 +41,7 @@ async def cmd_admin(message: Message):
         message.from_user.last_name,
         is_admin=1
     )
+    admin_cache.add(message.from_user.id)
     
     await message.answer(
         "🎮 *Панель администратора*\n\n"
@@ -39,11 +50,115 @@ async def cmd_admin(message: Message):
         parse_mode="Markdown"
     )
 
+@router.message(Command("cache_stats"), F.from_user.id == ADMIN_ID)
+async def cmd_cache_stats(message: Message, state: FSMContext):
+    """Показывает счетчики внутренних кэшей бота"""
+    caches = {
+        "Кэш администраторов": admin_cache.stats(),
+        "Кэш сообщений": get_message_cache_stats(),
+        "Кэш кодовых фраз": code_phrase_cache.stats(),
+        "Кэш состояний FSM": state.storage.stats(),
+        "Кэш клавиатур": get_keyboard_cache_stats(),
+    }
+    
+    text = ""
+    for title, stats in caches.items():
+        text += (
+            f"🗄 *{title}*\n"
+            f"- Записей: {stats['size']}\n"
+            f"- Попаданий: {stats['hits']}\n"
+            f"- Промахов: {stats['misses']}\n"
+            f"- Доля попаданий: {stats['hit_rate']:.1%}\n\n"
+        )
+    
+    await message.answer(text, parse_mode="Markdown")
+
+# Сегменты аудитории, выбираемые кнопками: (сегмент, значение). None - значение вводится отдельно
+AUDIENCE_CHOICES = {
+    "all": ("all", None),
+    "freebilet_yes": ("freebilet", 1),
+    "freebilet_no": ("freebilet", 0),
+    "joined_after": ("joined_after", None),
+    "ids": ("ids", None),
+}
+
+def describe_audience(audience):
+    """Описание аудитории рассылки для администратора"""
+    kind, value = audience
+    
+    if kind == "freebilet":
+        return "пользователям с подтвержденной регистрацией в freebilet" if value else "пользователям без подтвержденной регистрации в freebilet"
+    if kind == "joined_after":
+        return f"пользователям, зарегистрировавшимся с {datetime.fromisoformat(value):%d.%m.%Y}"
+    if kind == "unconfirmed":
+        return f"не подтвердившим сообщение #{value}"
+    if kind == "ids":
+        return f"выбранным пользователям ({len(value)} ID)"
+    return "всем пользователям"
+
 @router.message(F.text == "📢 Создать рассылку", F.from_user.id == ADMIN_ID)
 async def create_broadcast(message: Message, state: FSMContext):
     """Обработчик создания новой рассылки"""
     await message.answer(
-        "📝 Введите текст сообщения для рассылки всем пользователям:",
+        "👥 Выберите, кому отправить рассылку:",
+        reply_markup=audience_choice()
+    )
+    await state.set_state(AdminStates.choosing_audience)
+
+@router.callback_query(F.data.startswith("audience:"), F.from_user.id == ADMIN_ID)
+async def choose_audience(callback: CallbackQuery, state: FSMContext):
+    """Выбор сегмента аудитории рассылки"""
+    choice = callback.data.split(":")[1]
+    kind, value = AUDIENCE_CHOICES[choice]
+    await callback.answer()
+    
+    if kind == "joined_after":
+        prompt = "📅 Введите дату в формате ДД.ММ.ГГГГ: рассылка уйдет пользователям, зарегистрировавшимся начиная с этого дня."
+    elif kind == "ids":
+        prompt = "🔢 Введите ID пользователей через пробел, запятую или с новой строки:"
+    else:
+        await ask_broadcast_text(callback.message, state, (kind, value))
+        return
+    
+    await state.update_data(audience_kind=kind)
+    await callback.message.answer(prompt, reply_markup=cancel_button())
+    await state.set_state(AdminStates.waiting_for_audience_value)
+
+@router.message(StateFilter(AdminStates.waiting_for_audience_value), F.from_user.id == ADMIN_ID)
+async def process_audience_value(message: Message, state: FSMContext):
+    """Обработка даты или списка ID для выбранного сегмента"""
+    kind = (await state.get_data()).get("audience_kind")
+    text = message.text or ""
+    
+    if kind == "joined_after":
+        try:
+            value = datetime.strptime(text.strip(), "%d.%m.%Y").date().isoformat()
+        except ValueError:
+            await message.answer("❌ Не удалось разобрать дату. Введите ее в формате ДД.ММ.ГГГГ, например 01.09.2024:")
+            return
+    else:
+        value = sorted({int(user_id) for user_id in re.findall(r"\d+", text)})
+        if not value:
+            await message.answer("❌ В сообщении нет ни одного ID. Введите ID пользователей через пробел или запятую:")
+            return
+    
+    await ask_broadcast_text(message, state, (kind, value))
+
+async def ask_broadcast_text(message: Message, state: FSMContext, audience):
+    """Показывает размер выбранной аудитории и запрашивает текст рассылки"""
+    recipients = await count_audience(audience)
+    
+    if not recipients:
+        await message.answer(
+            f"😔 Нет активных пользователей для рассылки {describe_audience(audience)}.",
+            reply_markup=admin_main_menu()
+        )
+        await state.clear()
+        return
+    
+    await state.set_data({"audience": list(audience)})
+    await message.answer(
+        f"📝 Введите текст сообщения для рассылки {describe_audience(audience)} (получателей: {recipients}):",
         reply_markup=cancel_button()
     )
     await state.set_state(AdminStates.waiting_for_broadcast_message)
@@ -62,24 +177,20 @@ async def create_code_phrase(message: Message, state: FSMContext):
 async def process_broadcast_message(message: Message, state: FSMContext):
     """Обработка введенного текста рассылки"""
     broadcast_text = message.text
+    audience = tuple((await state.get_data()).get("audience") or ("all", None))
     
-    # Записываем сообщение в базу данных
-    message_id = await save_broadcast_message(broadcast_text, message.from_user.id)
-    
-    await message.answer("⏳ Начинаю рассылку сообщения всем пользователям...")
+    # Записываем сообщение и получателей из выбранного сегмента в базу данных
+    message_id = await save_broadcast_message(broadcast_text, message.from_user.id, audience=audience)
     
-    # Отправляем сообщение всем пользователям
-    sent_count, failed_count = await send_message_to_users(message.bot, broadcast_text, message_id)
-    
-    await message.answer(
-        f"✅ Рассылка завершена!\n\n"
-        f"📊 Статистика:\n"
-        f"- Отправлено: {sent_count}\n"
-        f"- Не удалось отправить: {failed_count}",
-        reply_markup=admin_message_status(message_id)
+    progress = await message.answer(
+        f"⏳ Начинаю рассылку сообщения {describe_audience(audience)}...",
+        reply_markup=broadcast_job_controls(message_id)
     )
     
-    # Сбрасываем состояние
+    # Рассылка идет в фоне, прогресс обновляется в отправленном сообщении
+    broadcast_jobs.start(message.bot, message_id, broadcast_text, False, message.chat.id, progress.message_id)
+    
+    # Сбрасываем состояние, не дожидаясь окончания рассылки
     await state.clear()
 
 @router.message(StateFilter(AdminStates.waiting_for_code_phrase), F.from_user.id == ADMIN_ID)
@@ -90,146 +201,319 @@ async def process_code_phrase(message: Message, state: FSMContext):
     # Записываем кодовую фразу в базу данных (is_code_phrase=1)
     message_id = await save_broadcast_message(code_phrase_text, message.from_user.id, is_code_phrase=1)
     
-    await message.answer("⏳ Начинаю рассылку кодовой фразы всем пользователям...")
+    progress = await message.answer(
+        "⏳ Начинаю рассылку кодовой фразы всем пользователям...",
+        reply_markup=broadcast_job_controls(message_id)
+    )
     
-    # Отправляем сообщение всем пользователям
-    sent_count, failed_count = await send_message_to_users(message.bot, code_phrase_text, message_id)
+    # Рассылка идет в фоне, прогресс обновляется в отправленном сообщении
+    broadcast_jobs.start(message.bot, message_id, code_phrase_text, True, message.chat.id, progress.message_id)
     
-    await message.answer(
-        f"✅ Рассылка кодовой фразы завершена!\n\n"
-        f"🔑 Фраза: `{code_phrase_text}`\n\n"
-        f"📊 Статистика:\n"
-        f"- Отправлено: {sent_count}\n"
-        f"- Не удалось отправить: {failed_count}",
-        reply_markup=admin_message_status(message_id),
-        parse_mode="Markdown"
+    # Сбрасываем состояние, не дожидаясь окончания рассылки
+    await state.clear()
+
+@router.callback_query(F.data.startswith("resend_unconfirmed:"), F.from_user.id == ADMIN_ID)
+async def resend_unconfirmed(callback: CallbackQuery):
+    """Предлагает повторно отправить сообщение тем, кто его не подтвердил"""
+    message = await get_message_by_id(int(callback.data.split(":")[1]))
+    
+    if not message:
+        await callback.answer("Сообщение не найдено", show_alert=True)
+        return
+    
+    # Повтор повтора отправляется не подтвердившим исходное сообщение
+    source_id = message['resend_of'] or message['id']
+    recipients = await count_audience(("unconfirmed", source_id))
+    
+    if not recipients:
+        if not await message_has_deliveries(source_id):
+            await callback.answer(
+                f"⚠️ Сообщение #{source_id} отправлено до учета доставок: список его получателей не сохранен, "
+                "повторить его не подтвердившим нельзя",
+                show_alert=True
+            )
+        else:
+            await callback.answer("✅ Все получатели уже подтвердили сообщение", show_alert=True)
+        return
+    
+    await callback.answer()
+    await callback.message.answer(
+        f"🔁 Отправить сообщение #{source_id} повторно {recipients} пользователям, которые его не подтвердили?\n\n"
+        "Повтор уйдет новой рассылкой со своей статистикой, подтверждения повтора засчитываются и исходному сообщению.",
+        reply_markup=resend_confirmation(source_id)
     )
+
+@router.callback_query(F.data.startswith("resend_confirm:"), F.from_user.id == ADMIN_ID)
+async def confirm_resend_unconfirmed(callback: CallbackQuery):
+    """Запускает повторную рассылку не подтвердившим пользователям"""
+    source_id = int(callback.data.split(":")[1])
+    source = await get_message_by_id(source_id)
+    
+    if not source:
+        await callback.answer("Сообщение не найдено", show_alert=True)
+        return
     
-    # Сбрасываем состояние
-    await state.clear()
+    await callback.answer()
+    # Повтор отправляется обычным сообщением: кодовая фраза уже есть в списке у получателей
+    source_id = source['resend_of'] or source_id
+    audience = ("unconfirmed", source_id)
+    message_id = await save_broadcast_message(
+        source['message_text'], callback.from_user.id, audience=audience, resend_of=source_id
+    )
+    
+    await callback.message.edit_text(
+        f"⏳ Начинаю повторную рассылку {describe_audience(audience)}...",
+        reply_markup=broadcast_job_controls(message_id)
+    )
+    broadcast_jobs.start(
+        callback.bot, message_id, source['message_text'], False, callback.message.chat.id, callback.message.message_id
+    )
+
+@router.callback_query(F.data.startswith("bjob_pause:"), F.from_user.id == ADMIN_ID)
+async def pause_broadcast_job(callback: CallbackQuery):
+    """Приостанавливает фоновую рассылку"""
+    job = broadcast_jobs.get(int(callback.data.split(":")[1]))
+    
+    if not job:
+        await callback.answer("Рассылка уже завершена")
+        return
+    
+    job.pause()
+    await callback.answer("⏸ Рассылка приостановлена")
+    await callback.message.edit_reply_markup(reply_markup=broadcast_job_controls(job.job_id, paused=True))
+
+@router.callback_query(F.data.startswith("bjob_resume:"), F.from_user.id == ADMIN_ID)
+async def resume_broadcast_job(callback: CallbackQuery):
+    """Возобновляет приостановленную рассылку"""
+    job = broadcast_jobs.get(int(callback.data.split(":")[1]))
+    
+    if not job:
+        await callback.answer("Рассылка уже завершена")
+        return
+    
+    job.resume()
+    await callback.answer("▶️ Рассылка продолжается")
+    await callback.message.edit_reply_markup(reply_markup=broadcast_job_controls(job.job_id))
+
+@router.callback_query(F.data.startswith("bjob_cancel:"), F.from_user.id == ADMIN_ID)
+async def cancel_broadcast_job(callback: CallbackQuery):
+    """Отменяет фоновую рассылку"""
+    job = broadcast_jobs.get(int(callback.data.split(":")[1]))
+    
+    if not job:
+        await callback.answer("Рассылка уже завершена")
+        return
+    
+    # Итоговую статистику в сообщение запишет сама задача рассылки
+    job.cancel()
+    await callback.answer("⛔ Рассылка отменена")
+
+# Максимальная длина текста сообщения в Telegram
+MESSAGE_MAX_LENGTH = 4096
+
+# Сколько символов кодовой фразы показывать в списке управления
+PHRASE_PREVIEW_LENGTH = 100
+
+def shorten(text, limit):
+    """Текст не длиннее limit символов, без обратных кавычек, ломающих разметку `...`"""
+    text = text.replace("`", "'")
+    return text if len(text) <= limit else text[:max(1, limit - 1)] + "…"
+
+async def render_code_phrases_page(page=0):
+    """Текст и клавиатура страницы управления кодовыми фразами"""
+    phrases, total = await get_code_phrases_page(page, CODE_PHRASES_PAGE_SIZE)
+    
+    # После удаления последней фразы на странице показываем предыдущую
+    if not phrases and page > 0:
+        page = max(0, (total - 1) // CODE_PHRASES_PAGE_SIZE)
+        phrases, total = await get_code_phrases_page(page, CODE_PHRASES_PAGE_SIZE)
+    
+    if not phrases:
+        return None, None
+    
+    pages = (total + CODE_PHRASES_PAGE_SIZE - 1) // CODE_PHRASES_PAGE_SIZE
+    statuses = {'active': "🟢 Активна", 'outdated': "🟠 Устарела"}
+    
+    header = f"📚 *Управление кодовыми фразами* (стр. {page + 1} из {pages}, всего {total})\n"
+    footer = "\n🟢 - активна, 🟠 - устарела, 🗑️ - удалить"
+    # Длинные фразы сокращаются, чтобы страница при любом размере помещалась в одно сообщение
+    line_budget = (MESSAGE_MAX_LENGTH - len(header) - len(footer)) // len(phrases) - 1
+    
+    lines = [header]
+    for phrase in phrases:
+        prefix = f"*#{phrase['id']}* {statuses.get(phrase['status'], phrase['status'])}: "
+        preview_length = min(PHRASE_PREVIEW_LENGTH, line_budget - len(prefix) - 2)
+        lines.append(f"{prefix}`{shorten(phrase['message_text'], preview_length)}`")
+    lines.append(footer)
+    
+    keyboard = code_phrases_manager(phrases, page, has_prev=page > 0, has_next=page + 1 < pages)
+    return "\n".join(lines), keyboard
 
 @router.message(F.text == "📚 Управление фразами", F.from_user.id == ADMIN_ID)
 async def manage_code_phrases(message: Message):
-    """Показывает список всех кодовых фраз с возможностью управления"""
-    code_phrases = await get_all_code_phrases()
+    """Показывает кодовые фразы постранично в одном сообщении с кнопками управления"""
+    text, keyboard = await render_code_phrases_page()
     
-    if not code_phrases:
+    if not text:
         await message.answer("❌ Кодовые фразы еще не были отправлены.")
         return
     
-    for phrase in code_phrases:
-        status_text = ""
-        if phrase['status'] == 'active':
-            status_text = "🟢 Активна"
-        elif phrase['status'] == 'outdated':
-            status_text = "🟠 Устарела"
-        elif phrase['status'] == 'deleted':
-            continue  # Пропускаем удаленные фразы
-        
-        text = (
-            f"🔑 *Кодовая фраза ID#{phrase['id']}*\n\n"
-            f"Статус: {status_text}\n"
-            f"Текст: `{phrase['message_text']}`\n"
-        )
-        
-        # Отправляем сообщение с кнопками управления статусом
-        await message.answer(
-            text,
-            reply_markup=code_phrase_status_buttons(phrase['id']),
-            parse_mode="Markdown"
-        )
+    await message.answer(text, reply_markup=keyboard, parse_mode="Markdown")
+
+@router.callback_query(F.data.startswith("codes_page:"), F.from_user.id == ADMIN_ID)
+async def navigate_code_phrases(callback: CallbackQuery):
+    """Переход между страницами управления кодовыми фразами"""
+    page = int(callback.data.split(":")[1])
+    await show_code_phrases_page(callback, page)
+
+async def show_code_phrases_page(callback: CallbackQuery, page):
+    """Перерисовывает страницу управления кодовыми фразами в том же сообщении"""
+    text, keyboard = await render_code_phrases_page(page)
+    
+    try:
+        if not text:
+            await callback.message.edit_text("❌ Кодовых фраз больше нет.")
+        else:
+            await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="Markdown")
+    except TelegramBadRequest as e:
+        # Содержимое страницы не изменилось; остальные ошибки Telegram не скрываются
+        if "message is not modified" not in str(e):
+            raise
+
+def parse_code_phrase_callback(data):
+    """ID фразы и номер страницы из callback_data вида 'code_active:ID:PAGE'"""
+    parts = data.split(":")
+    return int(parts[1]), int(parts[2]) if len(parts) > 2 else 0
+
+async def change_code_phrase_status(callback: CallbackQuery, status, changed_text, unchanged_text):
+    """Меняет статус кодовой фразы по кнопке и перерисовывает страницу"""
+    phrase_id, page = parse_code_phrase_callback(callback.data)
+    
+    # Проверяем и обновляем статус одним запросом
+    changed, current = await update_code_phrase_status(phrase_id, status)
+    
+    if changed:
+        await callback.answer(changed_text)
+    elif current == status:
+        # Статус уже такой, просто показываем уведомление
+        await callback.answer(unchanged_text)
+        return
+    elif current is None:
+        await callback.answer("❌ Фраза не найдена")
+    else:
+        # Кнопка со старой страницы: удаленная фраза не восстанавливается
+        await callback.answer("🗑️ Фраза уже удалена, изменить ее статус нельзя")
+    
+    await show_code_phrases_page(callback, page)
 
 @router.callback_query(F.data.startswith("code_active:"), F.from_user.id == ADMIN_ID)
 async def set_code_active(callback: CallbackQuery):
     """Устанавливает статус кодовой фразы как активный"""
-    phrase_id = int(callback.data.split(":")[1])
-    
-    # Проверяем текущий статус
-    all_phrases = await get_all_code_phrases()
-    current_phrase = next((p for p in all_phrases if p['id'] == phrase_id), None)
-    
-    # Если статус уже активен, просто показываем уведомление
-    if current_phrase and current_phrase['status'] == 'active':
-        await callback.answer("✅ Фраза уже имеет статус 'Активна'")
-        return
-    
-    # Обновляем статус в базе данных
-    await update_code_phrase_status(phrase_id, "active")
-    await callback.answer("✅ Статус изменен на 'Активна'")
-    
-    # Обновляем сообщение
-    text = callback.message.text.replace("🟠 Устарела", "🟢 Активна")
-    await callback.message.edit_text(
-        text,
-        reply_markup=code_phrase_status_buttons(phrase_id),
-        parse_mode="Markdown"
-    )
+    await change_code_phrase_status(callback, "active", "✅ Статус изменен на 'Активна'", "✅ Фраза уже имеет статус 'Активна'")
 
 @router.callback_query(F.data.startswith("code_outdated:"), F.from_user.id == ADMIN_ID)
 async def set_code_outdated(callback: CallbackQuery):
     """Устанавливает статус кодовой фразы как устаревший"""
-    phrase_id = int(callback.data.split(":")[1])
+    await change_code_phrase_status(callback, "outdated", "🟠 Статус изменен на 'Устарела'", "🟠 Фраза уже имеет статус 'Устарела'")
+
+@router.callback_query(F.data.startswith("code_delete:"), F.from_user.id == ADMIN_ID)
+async def delete_code_phrase(callback: CallbackQuery):
+    """Удаляет кодовую фразу"""
+    await change_code_phrase_status(callback, "deleted", "🗑️ Фраза удалена", "🗑️ Фраза уже удалена")
+
+def format_user_line(user, with_freebilet=False):
+    """Строка списка пользователей"""
+    username = user['username'] if user['username'] else 'Нет username'
+    name = f"{user['first_name']} {user['last_name'] or ''}".strip()
+    line = f"• {name} (@{username}) - ID: `{user['user_id']}`"
     
-    # Проверяем текущий статус
-    all_phrases = await get_all_code_phrases()
-    current_phrase = next((p for p in all_phrases if p['id'] == phrase_id), None)
+    if user.get('delivery_state') == 'blocked':
+        line += " | 🚫 Заблокировал бота"
+    elif user.get('delivery_state') == 'deactivated':
+        line += " | 🚫 Аккаунт удален"
     
-    # Если статус уже устаревший, просто показываем уведомление
-    if current_phrase and current_phrase['status'] == 'outdated':
-        await callback.answer("🟠 Фраза уже имеет статус 'Устарела'")
-        return
+    if with_freebilet:
+        line += f" | Freebilet: {'✅' if user['freebilet_confirmed'] else '❌'}"
     
-    # Обновляем статус в базе данных
-    await update_code_phrase_status(phrase_id, "outdated")
-    await callback.answer("🟠 Статус изменен на 'Устарела'")
+    return line
+
+async def render_users_page(cursor=0, backward=False):
+    """Текст и клавиатура страницы списка пользователей"""
+    users, has_prev, has_next = await get_users_page(cursor, backward, LIST_PAGE_SIZE)
     
-    # Обновляем сообщение
-    text = callback.message.text.replace("🟢 Активна", "🟠 Устарела")
-    await callback.message.edit_text(
-        text,
-        reply_markup=code_phrase_status_buttons(phrase_id),
-        parse_mode="Markdown"
-    )
+    if not users:
+        return None, None
+    
+    active, inactive = await count_users()
+    lines = [f"👥 *Список пользователей бота* ({active} активных, {inactive} недоступны)\n"]
+    lines.extend(format_user_line(user, with_freebilet=True) for user in users)
+    
+    keyboard = page_navigation("users_page", users[0]['user_id'], users[-1]['user_id'], has_prev, has_next)
+    return "\n".join(lines), keyboard
 
-@router.callback_query(F.data.startswith("code_delete:"), F.from_user.id == ADMIN_ID)
-async def delete_code_phrase(callback: CallbackQuery):
-    """Удаляет кодовую фразу"""
-    phrase_id = int(callback.data.split(":")[1])
+async def render_confirmed_page(message_id, cursor=0, backward=False):
+    """Текст и клавиатура страницы подтвердивших пользователей"""
+    users, has_prev, has_next = await get_confirmed_users_page(message_id, cursor, backward, LIST_PAGE_SIZE)
+    
+    if not users:
+        return None, None
+    
+    stats = await get_broadcast_stats(message_id)
+    lines = [f"✅ *Пользователи, подтвердившие получение* ({stats['confirmed'] if stats else len(users)})\n"]
+    lines.extend(format_user_line(user) for user in users)
     
-    # Обновляем статус в базе данных на 'deleted'
-    await update_code_phrase_status(phrase_id, "deleted")
+    keyboard = page_navigation(f"conf_page:{message_id}", users[0]['user_id'], users[-1]['user_id'], has_prev, has_next)
+    return "\n".join(lines), keyboard
+
+async def render_unconfirmed_page(message_id, cursor=0, backward=False, total=None):
+    """Текст и клавиатура страницы не подтвердивших пользователей
+
+    Общее количество считается один раз при открытии списка и передается дальше в кнопках страниц.
+    """
+    users, has_prev, has_next = await get_unconfirmed_users_page(message_id, cursor, backward, LIST_PAGE_SIZE)
+    
+    if not users:
+        return None, None
     
-    await callback.answer("🗑️ Фраза удалена")
+    if total is None:
+        total = await count_unconfirmed_users(message_id)
+    lines = [f"❌ *Пользователи, не подтвердившие получение* ({total})\n"]
+    lines.extend(format_user_line(user) for user in users)
     
-    # Удаляем сообщение с информацией о фразе
-    await callback.message.delete()
+    keyboard = page_navigation(f"unconf_page:{message_id}:{total}", users[0]['user_id'], users[-1]['user_id'], has_prev, has_next)
+    return "\n".join(lines), keyboard
 
 @router.message(F.text == "👥 Список пользователей", F.from_user.id == ADMIN_ID)
 async def list_users(message: Message):
-    """Показывает список всех пользователей бота"""
-    users = await get_all_users()
+    """Показывает первую страницу списка пользователей бота"""
+    text, keyboard = await render_users_page()
     
-    if not users:
+    if not text:
         await message.answer("😔 У бота пока нет пользователей.")
         return
     
-    text = f"👥 *Список пользователей бота* ({len(users)})\n\n"
-    
-    for idx, user in enumerate(users, start=1):
-        username = user['username'] if user['username'] else 'Нет username'
-        name = f"{user['first_name']} {user['last_name'] or ''}".strip()
-        freebilet = "✅" if user['freebilet_confirmed'] else "❌"
-        
-        text += f"{idx}. {name} (@{username}) - ID: `{user['user_id']}` | Freebilet: {freebilet}\n"
-        
-        # Telegram имеет ограничение на длину сообщения,
-        # поэтому разбиваем на части, если список большой
-        if idx % 50 == 0 and idx < len(users):
-            await message.answer(text, parse_mode="Markdown")
-            text = ""
+    await message.answer(text, reply_markup=keyboard, parse_mode="Markdown")
+
+@router.callback_query(F.data.startswith("users_page:"), F.from_user.id == ADMIN_ID)
+async def navigate_users(callback: CallbackQuery):
+    """Переход между страницами списка пользователей"""
+    _, cursor, direction = callback.data.split(":")
+    text, keyboard = await render_users_page(int(cursor), backward=direction == "p")
+    await edit_page(callback, text, keyboard)
+
+async def edit_page(callback: CallbackQuery, text, keyboard):
+    """Заменяет текущую страницу списка новой в том же сообщении"""
+    if not text:
+        await callback.answer("Больше записей нет")
+        return
     
-    if text:
-        await message.answer(text, parse_mode="Markdown")
+    await callback.answer()
+    try:
+        await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="Markdown")
+    except TelegramBadRequest as e:
+        # Повторное нажатие той же кнопки: страница не изменилась
+        if "message is not modified" not in str(e):
+            raise
 
 @router.message(F.text == "📊 Статистика последней рассылки", F.from_user.id == ADMIN_ID)
 async def last_broadcast_stats(message: Message):
@@ -240,10 +524,7 @@ async def last_broadcast_stats(message: Message):
         await message.answer("❌ Рассылок пока не было.")
         return
     
-    confirmations = await get_confirmations_for_message(last_message['id'])
-    unconfirmed = await get_unconfirmed_users(last_message['id'])
-    
-    all_users = len(confirmations) + len(unconfirmed)
+    stats = await get_broadcast_stats(last_message['id'])
     
     text = (
         f"📊 *Статистика последней рассылки*\n\n"
@@ -254,10 +535,7 @@ async def last_broadcast_stats(message: Message):
     else:
         text += f"📝 Сообщение: {last_message['message_text'][:100]}...\n\n"
     
-    text += (
-        f"✅ Подтвердили: {len(confirmations)} из {all_users} ({int(len(confirmations)/all_users*100 if all_users else 0)}%)\n"
-        f"❌ Не подтвердили: {len(unconfirmed)} из {all_users} ({int(len(unconfirmed)/all_users*100 if all_users else 0)}%)\n"
-    )
+    text += format_broadcast_stats(stats)
     
     await message.answer(
         text,
@@ -265,59 +543,85 @@ async def last_broadcast_stats(message: Message):
         parse_mode="Markdown"
     )
 
+def format_broadcast_stats(stats):
+    """Текст со счетчиками рассылки"""
+    recipients = stats['recipients'] if stats else 0
+    delivered = stats['delivered'] if stats else 0
+    confirmed = stats['confirmed'] if stats else 0
+    unconfirmed = max(0, recipients - confirmed)
+    
+    return (
+        f"📬 Доставлено: {delivered} из {recipients}\n"
+        f"✅ Подтвердили: {confirmed} из {recipients} ({int(confirmed/recipients*100 if recipients else 0)}%)\n"
+        f"❌ Не подтвердили: {unconfirmed} из {recipients} ({int(unconfirmed/recipients*100 if recipients else 0)}%)\n"
+    )
+
 @router.callback_query(F.data.startswith("confirmed_list:"), F.from_user.id == ADMIN_ID)
 async def show_confirmed_users(callback: CallbackQuery):
-    """Показывает список пользователей, подтвердивших получение сообщения"""
+    """Показывает первую страницу пользователей, подтвердивших получение сообщения"""
     await callback.answer()
     
     message_id = int(callback.data.split(":")[1])
-    confirmations = await get_confirmations_for_message(message_id)
+    text, keyboard = await render_confirmed_page(message_id)
     
-    if not confirmations:
+    if not text:
         await callback.message.answer("❌ Пока никто не подтвердил получение сообщения.")
         return
     
-    text = f"✅ *Пользователи, подтвердившие получение* ({len(confirmations)})\n\n"
-    
-    for idx, conf in enumerate(confirmations, start=1):
-        username = conf['username'] if conf['username'] else 'Нет username'
-        name = f"{conf['first_name']} {conf['last_name'] or ''}".strip()
-        
-        text += f"{idx}. {name} (@{username}) - ID: `{conf['user_id']}`\n"
-        
-        if idx % 50 == 0 and idx < len(confirmations):
-            await callback.message.answer(text, parse_mode="Markdown")
-            text = ""
-    
-    if text:
-        await callback.message.answer(text, parse_mode="Markdown")
+    await callback.message.answer(text, reply_markup=keyboard, parse_mode="Markdown")
+
+@router.callback_query(F.data.startswith("conf_page:"), F.from_user.id == ADMIN_ID)
+async def navigate_confirmed_users(callback: CallbackQuery):
+    """Переход между страницами подтвердивших пользователей"""
+    _, message_id, cursor, direction = callback.data.split(":")
+    text, keyboard = await render_confirmed_page(int(message_id), int(cursor), backward=direction == "p")
+    await edit_page(callback, text, keyboard)
 
 @router.callback_query(F.data.startswith("unconfirmed_list:"), F.from_user.id == ADMIN_ID)
 async def show_unconfirmed_users(callback: CallbackQuery):
-    """Показывает список пользователей, не подтвердивших получение сообщения"""
+    """Показывает первую страницу пользователей, не подтвердивших получение сообщения"""
     await callback.answer()
     
     message_id = int(callback.data.split(":")[1])
-    unconfirmed = await get_unconfirmed_users(message_id)
+    text, keyboard = await render_unconfirmed_page(message_id)
     
-    if not unconfirmed:
+    if not text:
         await callback.message.answer("✅ Все пользователи подтвердили получение сообщения!")
         return
     
-    text = f"❌ *Пользователи, не подтвердившие получение* ({len(unconfirmed)})\n\n"
-    
-    for idx, user in enumerate(unconfirmed, start=1):
-        username = user['username'] if user['username'] else 'Нет username'
-        name = f"{user['first_name']} {user['last_name'] or ''}".strip()
-        
-        text += f"{idx}. {name} (@{username}) - ID: `{user['user_id']}`\n"
-        
-        if idx % 50 == 0 and idx < len(unconfirmed):
-            await callback.message.answer(text, parse_mode="Markdown")
-            text = ""
-    
-    if text:
-        await callback.message.answer(text, parse_mode="Markdown")
+    await callback.message.answer(text, reply_markup=keyboard, parse_mode="Markdown")
+
+@router.callback_query(F.data.startswith("unconf_page:"), F.from_user.id == ADMIN_ID)
+async def navigate_unconfirmed_users(callback: CallbackQuery):
+    """Переход между страницами не подтвердивших пользователей"""
+    parts = callback.data.split(":")
+    message_id, cursor, direction = parts[1], parts[-2], parts[-1]
+    # В кнопках, отправленных до передачи количества, его нет: оно посчитается заново
+    total = int(parts[2]) if len(parts) == 5 else None
+    text, keyboard = await render_unconfirmed_page(int(message_id), int(cursor), backward=direction == "p", total=total)
+    await edit_page(callback, text, keyboard)
+
+@router.callback_query(F.data.startswith("export:"), F.from_user.id == ADMIN_ID)
+async def export_list(callback: CallbackQuery):
+    """Выгружает список пользователей одним CSV-документом"""
+    _, kind, message_id = callback.data.split(":")
+    message_id = int(message_id)
+    
+    await callback.answer("⏳ Готовлю файл...")
+    
+    path, rows = await export_to_csv(kind, message_id)
+    try:
+        filenames = {
+            "users": "users.csv",
+            "confirmed": f"confirmed_{message_id}.csv",
+            "unconfirmed": f"unconfirmed_{message_id}.csv",
+        }
+        await callback.message.answer_document(
+            FSInputFile(path, filename=filenames[kind]),
+            caption=f"📥 Выгрузка: {rows} записей"
+        )
+    finally:
+        os.remove(path)
 
 @router.callback_query(F.data.startswith("update_status:"), F.from_user.id == ADMIN_ID)
 async def update_message_status(callback: CallbackQuery):
@@ -326,12 +630,7 @@ async def update_message_status(callback: CallbackQuery):
     
     message_id = int(callback.data.split(":")[1])
     message_info = await get_message_by_id(message_id)
-    confirmations = await get_confirmations_for_message(message_id)
-    unconfirmed = await get_unconfirmed_users(message_id)
-    
-    all_users = len(confirmations) + len(unconfirmed)
-    confirmation_percent = int(len(confirmations)/all_users*100 if all_users else 0)
-    unconfirmed_percent = int(len(unconfirmed)/all_users*100 if all_users else 0)
+    stats = await get_broadcast_stats(message_id)
     
     # Создаем уникальный текст, добавляя метку времени или случайный индентификатор
     import time
@@ -346,10 +645,7 @@ async def update_message_status(callback: CallbackQuery):
     else:
         text += f"📝 Сообщение: {message_info['message_text'][:100] if message_info else ''}...\n\n"
     
-    text += (
-        f"✅ Подтвердили: {len(confirmations)} из {all_users} ({confirmation_percent}%)\n"
-        f"❌ Не подтвердили: {len(unconfirmed)} из {all_users} ({unconfirmed_percent}%)\n"
-    )
+    text += format_broadcast_stats(stats)
     
     await callback.message.edit_text(
         text,
@@ -7,10 +7,12 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 from database.db_operations import (
-    register_user, register_confirmation, get_message_by_id,
-    update_freebilet_status, get_all_code_phrases
+    register_user, get_message_by_id,
+    update_freebilet_status
 )
 from keyboards.user_keyboards import confirm_button, freebilet_check_keyboard, main_menu_keyboard
+from utils.confirmation_writer import confirmation_writer
+from utils.code_phrase_cache import code_phrase_cache
 
 router = Router()
 
@@ -115,23 +117,16 @@ async def cmd_help(message: Message):
 @router.message(F.text == "🔑 Мои кодовые фразы")
 async def cmd_codes(message: Message):
     """Показывает список всех кодовых фраз"""
-    code_phrases = await get_all_code_phrases()
+    # Готовый текст берется из кэша, база читается только после изменения фраз
+    text = await code_phrase_cache.get_text()
     
-    if not code_phrases:
+    if not text:
         await message.answer(
             "🔒 У вас пока нет кодовых фраз. Ожидайте отправки от администратора.",
             parse_mode="Markdown"
         )
         return
     
-    text = "🔑 *Ваши кодовые фразы:*\n\n"
-    
-    for idx, phrase in enumerate(code_phrases, start=1):
-        if phrase['status'] == 'active':
-            text += f"{idx}. `{phrase['message_text']}`\n\n"
-        elif phrase['status'] == 'outdated':
-            text += f"{idx}. ~~`{phrase['message_text']}`~~ _(устарело)_\n\n"
-    
     await message.answer(
         text,
         parse_mode="Markdown"
@@ -143,13 +138,16 @@ async def confirm_message_receipt(callback: CallbackQuery):
     message_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
     
-    # Регистрируем подтверждение в базе данных
-    confirmation_result = await register_confirmation(message_id, user_id)
+    # Получаем информацию о сообщении (из кэша сообщений)
+    message_info = await get_message_by_id(message_id)
+    
+    # Регистрируем подтверждение: повтор проверяется в памяти, запись в базу идет пакетами.
+    # Подтверждение повторной рассылки засчитывается и исходному сообщению
+    confirmation_result = await confirmation_writer.confirm(
+        message_id, user_id, source_id=message_info['resend_of'] if message_info else None
+    )
     
     if confirmation_result:
-        # Получаем информацию о сообщении
-        message_info = await get_message_by_id(message_id)
-        
         if message_info and message_info['is_code_phrase'] == 1:
             # Если это кодовая фраза, меняем формат подтверждения
             # Добавляем временную метку для уникальности сообщения
@@ -176,23 +174,6 @@ async def confirm_message_receipt(callback: CallbackQuery):
                 f"✅ Спасибо! Вы подтвердили получение сообщения (#{unique_id}):\n\n"
                 f"{message_info['message_text'] if message_info else 'Сообщение'}"
             )
-        
-        # Отправляем уведомление админу о подтверждении
-        try:
-            admin_id = message_info['sender_id'] if message_info else None
-            if admin_id:
-                first_name = callback.from_user.first_name
-                last_name = callback.from_user.last_name or ""
-                username = callback.from_user.username or "Нет username"
-                
-                await callback.bot.send_message(
-                    chat_id=admin_id,
-                    text=f"✅ Пользователь {first_name} {last_name} (@{username}) "
-                         f"подтвердил получение "
-                         f"{'кодовой фразы' if message_info and message_info['is_code_phrase'] == 1 else 'сообщения'}!"
-                )
-        except Exception as e:
-            logging.error(f"Ошибка при отправке уведомления админу: {e}")
     else:
         # Если пользователь уже подтверждал это сообщение
         await callback.answer("✅ Вы уже подтвердили получение этого сообщения.")
@@ -1,12 +1,14 @@
-from .admin_keyboards import admin_main_menu, admin_message_status, cancel_button, code_phrase_status_buttons
+from .admin_keyboards import admin_main_menu, admin_message_status, broadcast_job_controls, cancel_button, code_phrases_manager, page_navigation
 from .user_keyboards import confirm_button, freebilet_check_keyboard, main_menu_keyboard
 
 __all__ = [
     'admin_main_menu', 
     'admin_message_status', 
+    'broadcast_job_controls',
     'confirm_button', 
     'cancel_button', 
-    'code_phrase_status_buttons',
+    'code_phrases_manager',
     'freebilet_check_keyboard',
-    'main_menu_keyboard'
+    'main_menu_keyboard',
+    'page_navigation'
 ]
\ No newline at end of file
@@ -1,6 +1,8 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from keyboards.cache import cached_keyboard, static_keyboard
 
+@static_keyboard
 def admin_main_menu() -> ReplyKeyboardMarkup:
     """Главное меню администратора"""
     keyboard = ReplyKeyboardMarkup(
@@ -14,6 +16,7 @@ def admin_main_menu() -> ReplyKeyboardMarkup:
     )
     return keyboard
 
+@cached_keyboard
 def admin_message_status(message_id: int) -> InlineKeyboardMarkup:
     """Клавиатура статуса сообщения"""
     builder = InlineKeyboardBuilder()
@@ -27,17 +30,93 @@ def admin_message_status(message_id: int) -> InlineKeyboardMarkup:
     builder.add(
         InlineKeyboardButton(text="🔄 Обновить статус", callback_data=f"update_status:{message_id}")
     )
+    builder.add(
+        InlineKeyboardButton(text="🔁 Повторить не подтвердившим", callback_data=f"resend_unconfirmed:{message_id}")
+    )
+    builder.add(
+        InlineKeyboardButton(text="📥 Выгрузить подтвердивших (CSV)", callback_data=f"export:confirmed:{message_id}")
+    )
+    builder.add(
+        InlineKeyboardButton(text="📥 Выгрузить не подтвердивших (CSV)", callback_data=f"export:unconfirmed:{message_id}")
+    )
+    builder.add(
+        InlineKeyboardButton(text="📥 Выгрузить всех пользователей (CSV)", callback_data=f"export:users:{message_id}")
+    )
+    
+    builder.adjust(1)
+    
+    return builder.as_markup()
+
+@static_keyboard
+def audience_choice() -> InlineKeyboardMarkup:
+    """Выбор аудитории рассылки"""
+    builder = InlineKeyboardBuilder()
+    
+    builder.add(InlineKeyboardButton(text="👥 Все пользователи", callback_data="audience:all"))
+    builder.add(InlineKeyboardButton(text="✅ Подтвердили freebilet", callback_data="audience:freebilet_yes"))
+    builder.add(InlineKeyboardButton(text="❌ Не подтвердили freebilet", callback_data="audience:freebilet_no"))
+    builder.add(InlineKeyboardButton(text="📅 Зарегистрировались после даты", callback_data="audience:joined_after"))
+    builder.add(InlineKeyboardButton(text="🔢 Список ID", callback_data="audience:ids"))
+    builder.add(InlineKeyboardButton(text="❌ Отмена", callback_data="cancel"))
     
     builder.adjust(1)
     
     return builder.as_markup()
 
+@cached_keyboard
+def resend_confirmation(message_id: int) -> InlineKeyboardMarkup:
+    """Подтверждение повторной отправки сообщения не подтвердившим его пользователям"""
+    builder = InlineKeyboardBuilder()
+    
+    builder.add(
+        InlineKeyboardButton(text="✅ Отправить", callback_data=f"resend_confirm:{message_id}")
+    )
+    builder.add(InlineKeyboardButton(text="❌ Отмена", callback_data="cancel"))
+    
+    return builder.as_markup()
+
+@cached_keyboard
+def broadcast_job_controls(job_id: int, paused: bool = False) -> InlineKeyboardMarkup:
+    """Кнопки управления запущенной рассылкой"""
+    builder = InlineKeyboardBuilder()
+    
+    if paused:
+        builder.add(
+            InlineKeyboardButton(text="▶️ Продолжить", callback_data=f"bjob_resume:{job_id}")
+        )
+    else:
+        builder.add(
+            InlineKeyboardButton(text="⏸ Пауза", callback_data=f"bjob_pause:{job_id}")
+        )
+    builder.add(
+        InlineKeyboardButton(text="⛔ Отменить", callback_data=f"bjob_cancel:{job_id}")
+    )
+    
+    return builder.as_markup()
+
+def page_navigation(callback_prefix: str, first_id: int, last_id: int, has_prev: bool, has_next: bool) -> InlineKeyboardMarkup:
+    """Кнопки перехода между страницами списка"""
+    builder = InlineKeyboardBuilder()
+    
+    if has_prev:
+        builder.add(
+            InlineKeyboardButton(text="⬅️ Назад", callback_data=f"{callback_prefix}:{first_id}:p")
+        )
+    if has_next:
+        builder.add(
+            InlineKeyboardButton(text="Вперед ➡️", callback_data=f"{callback_prefix}:{last_id}:n")
+        )
+    
+    return builder.as_markup()
+
+@static_keyboard
 def cancel_button() -> InlineKeyboardMarkup:
     """Кнопка отмены"""
     builder = InlineKeyboardBuilder()
     builder.add(InlineKeyboardButton(text="❌ Отмена", callback_data="cancel"))
     return builder.as_markup()
 
+@cached_keyboard
 def user_info_buttons(user_id: int) -> InlineKeyboardMarkup:
     """Кнопки действий с пользователем"""
     builder = InlineKeyboardBuilder()
@@ -48,20 +127,23 @@ def user_info_buttons(user_id: int) -> InlineKeyboardMarkup:
     
     return builder.as_markup()
 
-def code_phrase_status_buttons(phrase_id: int) -> InlineKeyboardMarkup:
-    """Кнопки управления статусом кодовой фразы"""
+def code_phrases_manager(phrases: list, page: int, has_prev: bool, has_next: bool) -> InlineKeyboardMarkup:
+    """Кнопки управления статусом кодовых фраз на странице и переход между страницами"""
     builder = InlineKeyboardBuilder()
     
-    builder.add(
-        InlineKeyboardButton(text="🟢 Пометить как активную", callback_data=f"code_active:{phrase_id}")
-    )
-    builder.add(
-        InlineKeyboardButton(text="🟠 Пометить как устаревшую", callback_data=f"code_outdated:{phrase_id}")
-    )
-    builder.add(
-        InlineKeyboardButton(text="🗑️ Удалить фразу", callback_data=f"code_delete:{phrase_id}")
-    )
+    for phrase in phrases:
+        builder.row(
+            InlineKeyboardButton(text=f"🟢 #{phrase['id']}", callback_data=f"code_active:{phrase['id']}:{page}"),
+            InlineKeyboardButton(text=f"🟠 #{phrase['id']}", callback_data=f"code_outdated:{phrase['id']}:{page}"),
+            InlineKeyboardButton(text=f"🗑️ #{phrase['id']}", callback_data=f"code_delete:{phrase['id']}:{page}")
+        )
     
-    builder.adjust(1)
+    navigation = []
+    if has_prev:
+        navigation.append(InlineKeyboardButton(text="⬅️ Назад", callback_data=f"codes_page:{page - 1}"))
+    if has_next:
+        navigation.append(InlineKeyboardButton(text="Вперед ➡️", callback_data=f"codes_page:{page + 1}"))
+    if navigation:
+        builder.row(*navigation)
     
     return builder.as_markup()
\ No newline at end of file
@@ -0,0 +1,46 @@
+from functools import wraps
+from config import KEYBOARD_CACHE_SIZE
+from database.cache import LRUCache
+
+# Общий кэш клавиатур с параметрами, ключ - (функция, аргументы)
+_keyboard_cache = LRUCache(maxsize=KEYBOARD_CACHE_SIZE)
+
+def cached_keyboard(factory):
+    """Кэширует клавиатуру, построенную с одними и теми же аргументами
+
+    Все вызовы с одними аргументами получают один и тот же объект разметки. Объекты aiogram
+    изменяемы, поэтому вызывающий код не должен менять полученную клавиатуру: для измененной
+    копии используется InlineKeyboardBuilder.from_markup(...). Кэшировать стоит только
+    клавиатуры с повторяющимися аргументами, иначе разовые ключи вытесняют полезные записи.
+    Аргументы должны быть хешируемыми.
+    """
+    @wraps(factory)
+    def wrapper(*args, **kwargs):
+        key = (factory.__qualname__, args, tuple(sorted(kwargs.items())))
+        markup = _keyboard_cache.get(key)
+        if markup is None:
+            markup = factory(*args, **kwargs)
+            _keyboard_cache.set(key, markup)
+        return markup
+
+    return wrapper
+
+def static_keyboard(factory):
+    """Строит клавиатуру без параметров один раз и дальше возвращает тот же объект
+
+    Как и в cached_keyboard, полученную клавиатуру нельзя изменять.
+    """
+    markup = None
+
+    @wraps(factory)
+    def wrapper():
+        nonlocal markup
+        if markup is None:
+            markup = factory()
+        return markup
+
+    return wrapper
+
+def get_keyboard_cache_stats():
+    """Счетчики кэша клавиатур с параметрами"""
+    return _keyboard_cache.stats()
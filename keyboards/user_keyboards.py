@@ -1,6 +1,8 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from keyboards.cache import cached_keyboard, static_keyboard
 
+@cached_keyboard
 def confirm_button(message_id: int) -> InlineKeyboardMarkup:
     """Кнопка подтверждения получения сообщения"""
     builder = InlineKeyboardBuilder()
@@ -11,6 +13,7 @@ def confirm_button(message_id: int) -> InlineKeyboardMarkup:
     
     return builder.as_markup()
 
+@static_keyboard
 def freebilet_check_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура проверки регистрации в freebilet"""
     builder = InlineKeyboardBuilder()
@@ -26,6 +29,7 @@ def freebilet_check_keyboard() -> InlineKeyboardMarkup:
     
     return builder.as_markup()
 
+@static_keyboard
 def main_menu_keyboard() -> ReplyKeyboardMarkup:
     """Основное меню пользователя"""
     keyboard = ReplyKeyboardMarkup(
@@ -1,3 +1,4 @@
 from .role_middleware import RoleMiddleware
+from .heartbeat_middleware import HeartbeatMiddleware
 
-__all__ = ['RoleMiddleware']
\ No newline at end of file
+__all__ = ['RoleMiddleware', 'HeartbeatMiddleware']
\ No newline at end of file
@@ -0,0 +1,19 @@
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+from utils.heartbeat import heartbeat
+
+class HeartbeatMiddleware(BaseMiddleware):
+    """Middleware для учета полученных обновлений и задержки их обработки в пульсе процесса"""
+    
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        # Время отправки известно только для сообщений
+        message = event.message or event.edited_message
+        heartbeat.record_update(message.date.timestamp() if message else None)
+        
+        return await handler(event, data)
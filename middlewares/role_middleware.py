@@ -1,7 +1,8 @@
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import Message
-from database.db_operations import check_admin, register_user
+from utils.admin_cache import admin_cache
+from utils.profile_refresher import profile_refresher
 
 class RoleMiddleware(BaseMiddleware):
     """Middleware для определения роли пользователя (админ или обычный пользователь)"""
@@ -14,9 +15,11 @@ class RoleMiddleware(BaseMiddleware):
     ) -> Any:
         user = event.from_user
         
-        # Регистрируем пользователя, если он новый
-        # Проверяем, является ли он администратором
-        is_admin = await check_admin(user.id)
+        # Изменившиеся имена пользователя запишутся в базу пакетом, без записи на каждое обновление
+        profile_refresher.observe(user)
+        
+        # Проверяем, является ли пользователь администратором (по кэшу, без обращения к базе)
+        is_admin = await admin_cache.is_admin(user.id)
         data["is_admin"] = is_admin
         
         # Продолжаем выполнение обработчика
@@ -1,57 +1,389 @@
 #!/usr/bin/env python3
+import fcntl
 import os
 import sys
+import json
 import time
+import random
+import secrets
+import signal
 import subprocess
+import threading
 import logging
 from datetime import datetime
-
-# Настройка логирования для файла веб-приложения
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("pa_webapp_log.log")
-    ]
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import (
+    BOT_WORKERS, HEARTBEAT_DIR, HEARTBEAT_TIMEOUT, RESTART_BACKOFF_BASE, RESTART_BACKOFF_MAX,
+    RESTART_RESET_AFTER, SUPERVISOR_HEALTH_PORT
 )
+from utils.heartbeat import heartbeat_path, read_heartbeat
+from utils.logging_setup import setup_logging
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# PID-файл супервизора и файл с его последним состоянием для эндпоинта /health
+PID_FILE = os.path.join(HEARTBEAT_DIR, "supervisor.pid")
+STATUS_FILE = os.path.join(HEARTBEAT_DIR, "supervisor.json")
+
+def is_process_alive(pid):
+    """Проверяет, существует ли процесс с указанным PID"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но принадлежит другому пользователю
+        return True
+    return True
+
+def read_pid_file(path=PID_FILE):
+    try:
+        with open(path) as file:
+            return int(file.read().strip())
+    except (OSError, ValueError):
+        return None
+
+# Дескриптор PID-файла, заблокированного супервизором: открыт, пока супервизор работает
+_pid_file_fd = None
+
+def acquire_pid_file(path=PID_FILE, attempts=20, delay=0.05):
+    """Захватывает PID-файл супервизора, возвращает False, если супервизор уже запущен
+
+    Признак работающего супервизора - блокировка flock на PID-файле, а не записанный в нем PID.
+    Проверка и захват выполняются одной атомарной операцией, а блокировку снимает ОС при
+    завершении процесса, поэтому файл, оставшийся после сбоя или перезапуска контейнера
+    (PID в нем мог достаться другому процессу), не мешает запуску.
+
+    supervisor_running на мгновение берет разделяемую блокировку того же файла, поэтому
+    занятый файл проверяется несколько раз: супервизор держит блокировку постоянно,
+    а проверка - нет.
+    """
+    global _pid_file_fd
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    for attempt in range(attempts):
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            break
+        except BlockingIOError:
+            if attempt == attempts - 1:
+                os.close(fd)
+                return False
+            time.sleep(delay)
+
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    _pid_file_fd = fd
+    return True
+
+def supervisor_running(path=PID_FILE):
+    """Проверяет, работает ли супервизор (PID-файл заблокирован другим процессом)
+
+    В Linux блокировки flock не видны через fcntl(F_GETLK), поэтому проверка берет
+    разделяемую блокировку без ожидания и сразу ее снимает; запускающийся в этот момент
+    супервизор повторит попытку захвата (см. acquire_pid_file).
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return False
+
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        # Закрытие дескриптора снимает и проверочную блокировку
+        os.close(fd)
+    return False
+
+class BotProcess:
+    """Процесс бота под управлением супервизора"""
+
+    def __init__(self, role, index=0, **env):
+        self.role = role
+        self.index = index
+        self.name = f"{role}-{index}"
+        self.heartbeat_path = heartbeat_path(role, index)
+        self.env = {"BOT_ROLE": role, "WORKER_INDEX": str(index), **env}
+        self.process = None
+        self.started_at = None
+
+    def start(self):
+        # Пульс прошлого запуска не должен приниматься за пульс нового процесса
+        try:
+            os.remove(self.heartbeat_path)
+        except FileNotFoundError:
+            pass
+
+        self.process = subprocess.Popen([sys.executable, "bot.py"], cwd=BASE_DIR, env={**os.environ, **self.env})
+        self.started_at = time.time()
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process else None
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None and is_process_alive(self.process.pid)
+
+    def heartbeat(self):
+        """Пульс текущего процесса (пульс процесса с другим PID не учитывается)"""
+        beat = read_heartbeat(self.heartbeat_path)
+        if beat is None or beat.get("pid") != self.pid:
+            return None
+        return beat
+
+    def problem(self, now):
+        """Причина, по которой процесс нужно перезапустить, или None"""
+        if not self.alive():
+            return f"процесс {self.name} (PID {self.pid}) завершился с кодом {self.process.poll()}"
+
+        beat = self.heartbeat()
+        last_beat = beat["time"] if beat else self.started_at
+        if now - last_beat > HEARTBEAT_TIMEOUT:
+            return f"процесс {self.name} (PID {self.pid}) не отправлял пульс {now - last_beat:.0f} с"
+        return None
+
+    def stop(self):
+        if self.alive():
+            self.process.send_signal(signal.SIGTERM)
+
+    def wait(self, timeout):
+        if self.process is None:
+            return
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            logging.warning(f"Процесс {self.name} (PID {self.pid}) не завершился за {timeout} с, принудительная остановка")
+            self.process.kill()
+            self.process.wait()
+
+class BotSupervisor:
+    """Запуск процессов бота, проверка их состояния и перезапуск с экспоненциальной паузой
+
+    Процесс считается неработающим, если он завершился или перестал обновлять файл пульса.
+    При сбое перезапускается вся группа процессов. Время от запуска до момента, когда все
+    процессы начали принимать обновления, измеряется при каждом перезапуске.
+    """
+
+    def __init__(self, workers=BOT_WORKERS, check_interval=1):
+        self.workers = workers
+        self.check_interval = check_interval
+        self.started_at = time.time()
+        self.restarts = 0
+        # Подряд идущие сбои, от них зависит пауза перед перезапуском
+        self.failures = 0
+        self.processes = []
+        self.group_started_at = None
+        self.serving_at = None
+        self.last_restart_to_serving = None
+        self.last_problem = None
+
+    def run(self):
+        """Основной цикл супервизора"""
+        if not acquire_pid_file():
+            logging.info(f"Супервизор уже запущен (PID {read_pid_file()})")
+            return
+
+        # SIGTERM завершает супервизор так же, как Ctrl+C, с остановкой процессов бота
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        if SUPERVISOR_HEALTH_PORT:
+            self.start_health_server(SUPERVISOR_HEALTH_PORT)
 
-def run_bot():
-    """Запускает бота и перезапускает его в случае сбоя"""
-    while True:
         try:
-            logging.info(f"Запуск бота: {datetime.now()}")
-            # Запускаем бота как отдельный процесс
-            subprocess.run([sys.executable, "bot.py"])
+            while True:
+                self.last_problem = self.run_group()
+                logging.error(f"Сбой бота: {self.last_problem}")
+
+                if self.serving_at and time.time() - self.serving_at >= RESTART_RESET_AFTER:
+                    self.failures = 0
+                self.failures += 1
+                self.restarts += 1
+
+                delay = self.backoff_delay()
+                logging.info(f"Перезапуск бота через {delay:.1f} с (сбоев подряд: {self.failures})")
+                self.write_status(state="restarting")
+                time.sleep(delay)
+        finally:
+            self.stop_group()
+            self.write_status(state="stopped")
+            # PID-файл не удаляется: другой процесс мог уже открыть его и ждать блокировку,
+            # после удаления следующий запуск заблокировал бы уже другой файл
+
+    def run_group(self):
+        """Запускает группу процессов и следит за ней до первого сбоя, возвращает его причину"""
+        logging.info(f"Запуск бота: {datetime.now()}")
+        self.group_started_at = time.time()
+        self.serving_at = None
+
+        try:
+            if self.workers > 1:
+                # Миграции применяются один раз до запуска процессов, работающих с базой
+                subprocess.run([sys.executable, "-m", "database"], cwd=BASE_DIR, check=True)
+
+                # Каждый рабочий процесс обрабатывает пользователей с user_id % workers, равным его номеру
+                shard_env = {"BOT_WORKERS": str(self.workers), "SHARD_SECRET": secrets.token_hex(16)}
+                self.processes = [BotProcess("worker", index, **shard_env) for index in range(self.workers)]
+                self.processes.append(BotProcess("receiver", **shard_env))
+            else:
+                self.processes = [BotProcess("single")]
+
+            for process in self.processes:
+                process.start()
+
+            while True:
+                time.sleep(self.check_interval)
+                now = time.time()
+                problem = next(filter(None, (process.problem(now) for process in self.processes)), None)
+                if problem:
+                    return problem
+                self.check_serving()
+                self.write_status()
         except Exception as e:
-            logging.error(f"Ошибка при запуске бота: {e}")
-        
-        # Пауза перед перезапуском
-        logging.info("Перезапуск бота через 10 секунд...")
-        time.sleep(10)
+            return f"ошибка при запуске бота: {e}"
+        finally:
+            self.stop_group()
+
+    def check_serving(self):
+        """Фиксирует время перезапуска, когда все процессы начали принимать обновления"""
+        if self.serving_at is not None:
+            return
+
+        beats = [process.heartbeat() for process in self.processes]
+        if all(beat and beat.get("serving_at") for beat in beats):
+            self.serving_at = max(beat["serving_at"] for beat in beats)
+            self.last_restart_to_serving = self.serving_at - self.group_started_at
+            logging.info(f"Бот принимает обновления через {self.last_restart_to_serving:.2f} с после запуска")
+
+    def stop_group(self, timeout=30):
+        """Останавливает процессы, давая им дописать данные и доработать очереди"""
+        for process in self.processes:
+            process.stop()
+        for process in self.processes:
+            process.wait(timeout)
+        self.processes = []
+
+    def backoff_delay(self):
+        """Экспоненциальная пауза перед перезапуском со случайным разбросом"""
+        delay = min(RESTART_BACKOFF_BASE * 2 ** (self.failures - 1), RESTART_BACKOFF_MAX)
+        # Разброс не дает нескольким экземплярам перезапускаться синхронно
+        return random.uniform(delay / 2, delay)
+
+    def health(self, state=None):
+        """Состояние супервизора и процессов бота"""
+        now = time.time()
+        processes = []
+        last_update = None
+
+        for process in self.processes:
+            beat = process.heartbeat() or {}
+            processes.append({
+                "name": process.name,
+                "pid": process.pid,
+                "alive": process.alive(),
+                "heartbeat_age": now - beat["time"] if beat else None,
+                "serving": bool(beat.get("serving_at")),
+                "updates": beat.get("updates", 0),
+            })
+            if beat.get("last_update_at") and (last_update is None or beat["last_update_at"] > last_update["last_update_at"]):
+                last_update = beat
+
+        if state is None:
+            state = "ok" if self.serving_at and all(process["alive"] for process in processes) else "starting"
+
+        return {
+            "status": state,
+            "pid": os.getpid(),
+            "uptime": now - self.started_at,
+            "bot_uptime": now - self.serving_at if self.serving_at else None,
+            "restarts": self.restarts,
+            "consecutive_failures": self.failures,
+            "last_problem": self.last_problem,
+            "last_restart_to_serving": self.last_restart_to_serving,
+            "last_update_age": now - last_update["last_update_at"] if last_update else None,
+            "last_update_lag": last_update.get("last_update_lag") if last_update else None,
+            "processes": processes,
+            "time": now,
+        }
+
+    def write_status(self, state=None):
+        """Сохраняет состояние в файл, из которого его читает WSGI-приложение"""
+        tmp_path = f"{STATUS_FILE}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(self.health(state), file)
+            os.replace(tmp_path, STATUS_FILE)
+        except OSError as e:
+            logging.error(f"Ошибка записи состояния супервизора: {e}")
+
+    def start_health_server(self, port):
+        """Запускает HTTP-эндпоинт /health на 127.0.0.1 в отдельном потоке"""
+        supervisor = self
+
+        class HealthHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/health":
+                    self.send_error(404)
+                    return
+                health = supervisor.health()
+                body = json.dumps(health).encode("utf-8")
+                self.send_response(200 if health["status"] == "ok" else 503)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), HealthHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logging.info(f"Эндпоинт состояния супервизора: http://127.0.0.1:{port}/health")
+
+def run_bot():
+    """Запускает бота под управлением супервизора и перезапускает его в случае сбоя"""
+    # Логирование настраивается только в процессе супервизора: при импорте модуля WSGI-сервером
+    # (PythonAnywhere) обработчики хоста и его потоки остаются нетронутыми
+    setup_logging(os.path.join(BASE_DIR, "pa_webapp_log.log"), stream=False)
+    BotSupervisor().run()
+
+def read_health():
+    """Состояние супервизора для WSGI-приложения"""
+    if not supervisor_running():
+        return {"status": "down", "pid": None}
+
+    health = read_heartbeat(STATUS_FILE) or {"status": "starting"}
+    if health.get("time") and time.time() - health["time"] > HEARTBEAT_TIMEOUT:
+        # Супервизор жив, но давно не обновлял состояние
+        health["status"] = "stale"
+    return health
 
 # Для PythonAnywhere: Создаем функцию для запуска через API
 def application(environ, start_response):
-    # Проверяем, запущен ли уже бот
-    if not os.path.exists("bot_running.lock"):
-        # Создаем файл блокировки
-        with open("bot_running.lock", "w") as f:
-            f.write(str(datetime.now()))
-        
-        # Запускаем бота в отдельном процессе
-        try:
-            subprocess.Popen([sys.executable, "bot.py"])
-            status = "200 OK"
-            output = "Bot started successfully".encode("utf-8")
-        except Exception as e:
-            status = "500 Internal Server Error"
-            output = f"Error starting bot: {e}".encode("utf-8")
+    if environ.get("PATH_INFO") == "/health":
+        health = read_health()
+        status = "200 OK" if health["status"] == "ok" else "503 Service Unavailable"
+        output = json.dumps(health).encode("utf-8")
+        content_type = "application/json"
     else:
-        status = "200 OK"
-        output = "Bot is already running".encode("utf-8")
-    
-    response_headers = [("Content-type", "text/plain"), ("Content-Length", str(len(output)))]
+        content_type = "text/plain"
+        # Проверяем, запущен ли уже супервизор бота (по блокировке PID-файла, а не по наличию файла)
+        if supervisor_running():
+            status = "200 OK"
+            output = "Bot is already running".encode("utf-8")
+        else:
+            # Запускаем супервизор, который сам запустит и будет перезапускать бота
+            try:
+                subprocess.Popen([sys.executable, os.path.abspath(__file__)], cwd=BASE_DIR, start_new_session=True)
+                status = "200 OK"
+                output = "Bot started successfully".encode("utf-8")
+            except Exception as e:
+                status = "500 Internal Server Error"
+                output = f"Error starting bot: {e}".encode("utf-8")
+
+    response_headers = [("Content-type", content_type), ("Content-Length", str(len(output)))]
     start_response(status, response_headers)
-    
+
     return [output]
 
 # Для запуска локально
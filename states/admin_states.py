@@ -3,6 +3,12 @@ from aiogram.fsm.state import StatesGroup, State
 class AdminStates(StatesGroup):
     """Состояния для машины состояний администратора"""
     
+    # Состояние выбора аудитории рассылки
+    choosing_audience = State()
+    
+    # Состояние ожидания даты или списка ID для выбранного сегмента аудитории
+    waiting_for_audience_value = State()
+    
     # Состояние ожидания ввода сообщения для рассылки
     waiting_for_broadcast_message = State()
     
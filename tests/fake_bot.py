@@ -0,0 +1,39 @@
+"""Заглушка aiogram.Bot для тестов и локальных замеров рассылки без обращения к Telegram"""
+import asyncio
+import itertools
+import time
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+class FakeMessage:
+    def __init__(self, message_id, chat_id):
+        self.message_id = message_id
+        self.chat_id = chat_id
+
+class FakeBot:
+    """Имитирует send_message с задержкой сети и заданными ошибками"""
+
+    def __init__(self, latency=0.05, retry_after=None, network_errors=None):
+        # retry_after: {chat_id: секунды} - первая отправка в чат получит TelegramRetryAfter
+        # network_errors: {chat_id: количество} - столько раз подряд будет TelegramNetworkError
+        self.latency = latency
+        self.retry_after = dict(retry_after or {})
+        self.network_errors = dict(network_errors or {})
+        self.sent = []
+        self.calls = 0
+        self._message_ids = itertools.count(1)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        method = SendMessage(chat_id=chat_id, text=text)
+
+        if chat_id in self.retry_after:
+            raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=self.retry_after.pop(chat_id))
+
+        if self.network_errors.get(chat_id):
+            self.network_errors[chat_id] -= 1
+            raise TelegramNetworkError(method=method, message="Connection reset")
+
+        self.sent.append((time.monotonic(), chat_id))
+        return FakeMessage(next(self._message_ids), chat_id)
@@ -0,0 +1,56 @@
+"""Проверка лимита скорости и повторных попыток рассылки на FakeBot
+
+Запуск из корня проекта: python -m pytest tests
+"""
+import asyncio
+from aiogram.exceptions import TelegramNetworkError
+from tests.fake_bot import FakeBot
+from utils.broadcaster import Broadcaster
+from utils.rate_limiter import TokenBucket, ChatRateLimiter
+
+def run_broadcast(bot, chat_ids, rate=1000, **kwargs):
+    """Запускает рассылку и возвращает (отправлено, ошибок, {chat_id: ошибка}, рассыльщик)"""
+    errors = {}
+
+    async def on_result(chat_id, message, error):
+        errors[chat_id] = error
+
+    async def main():
+        broadcaster = Broadcaster(
+            bot, limiter=TokenBucket(rate), per_chat_limiter=ChatRateLimiter(rate=1000), **kwargs
+        )
+        sent, failed = await broadcaster.run(chat_ids, on_result=on_result, text="test")
+        return sent, failed, broadcaster
+
+    sent, failed, broadcaster = asyncio.run(main())
+    return sent, failed, errors, broadcaster
+
+def test_send_rate_stays_within_limit():
+    rate = 50
+    bot = FakeBot(latency=0.01)
+
+    sent, failed, _, _ = run_broadcast(bot, range(1, 151), rate=rate, concurrency=20)
+
+    assert (sent, failed) == (150, 0)
+    stamps = sorted(stamp for stamp, _ in bot.sent)
+    # Token bucket допускает не больше capacity + rate * T отправок за любой интервал T
+    # (запас в 2 отправки - на неравномерность планировщика)
+    for i in range(len(stamps)):
+        for j in range(i + 1, len(stamps)):
+            assert j - i + 1 <= rate + rate * (stamps[j] - stamps[i]) + 2
+
+def test_transient_errors_are_retried_then_recorded_as_failed():
+    # Чат 10 получит flood control, чат 20 - две сетевые ошибки, чат 30 - больше ошибок, чем повторов
+    bot = FakeBot(latency=0, retry_after={10: 1}, network_errors={20: 2, 30: 10})
+
+    sent, failed, errors, _ = run_broadcast(
+        bot, range(1, 41), concurrency=5, max_retries=3, backoff_base=0.01
+    )
+
+    assert (sent, failed) == (39, 1)
+    assert errors[10] is None and errors[20] is None
+    assert isinstance(errors[30], TelegramNetworkError)
+    delivered = {chat_id for _, chat_id in bot.sent}
+    assert {10, 20} <= delivered and 30 not in delivered
+    # 40 первых попыток, 1 повтор для чата 10, 2 для чата 20, 3 для чата 30
+    assert bot.calls == 40 + 1 + 2 + 3
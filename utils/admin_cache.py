@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import time
+from config import ADMIN_CACHE_TTL
+from database.db_operations import get_admin_ids
+
+class AdminCache:
+    """Кэш множества администраторов с временем жизни и явной инвалидацией"""
+
+    def __init__(self, ttl=ADMIN_CACHE_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._admin_ids = frozenset()
+        self._loaded_at = None
+        self._lock = asyncio.Lock()
+        self._refresh_task = None
+
+    async def load(self):
+        """Загружает множество администраторов из базы данных"""
+        async with self._lock:
+            self._admin_ids = frozenset(await get_admin_ids())
+            self._loaded_at = time.monotonic()
+        logging.info(f"Кэш администраторов загружен: {len(self._admin_ids)} шт.")
+
+    async def is_admin(self, user_id):
+        """Проверяет, является ли пользователь администратором"""
+        if self._loaded_at is None:
+            # Первое обращение до загрузки при старте - читаем базу синхронно
+            self.misses += 1
+            await self.load()
+        elif time.monotonic() - self._loaded_at > self.ttl:
+            # Устаревший кэш отвечает сразу, а обновляется в фоне
+            self.misses += 1
+            self._schedule_refresh()
+        else:
+            self.hits += 1
+
+        return user_id in self._admin_ids
+
+    def add(self, user_id):
+        """Добавляет администратора в кэш без обращения к базе"""
+        self._admin_ids = self._admin_ids | {user_id}
+
+    def invalidate(self):
+        """Помечает кэш устаревшим, следующее обращение перечитает базу"""
+        self._loaded_at = None
+
+    def stats(self):
+        """Счетчики попаданий и промахов кэша"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._admin_ids),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def _schedule_refresh(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+    async def _refresh(self):
+        try:
+            await self.load()
+        except Exception as e:
+            logging.error(f"Ошибка обновления кэша администраторов: {e}")
+
+# Общий кэш администраторов процесса
+admin_cache = AdminCache()
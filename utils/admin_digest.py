@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from config import ADMIN_DIGEST_INTERVAL
+from database.db_operations import get_confirmation_counts
+from utils.confirmation_writer import confirmation_writer
+from utils.rate_limiter import global_limiter
+from utils.update_workers import user_shard
+
+class ConfirmationDigest:
+    """Сводка новых подтверждений для администратора вместо сообщения на каждое подтверждение
+
+    Новые подтверждения считаются по счетчикам broadcast_stats в базе. Поэтому при нескольких
+    рабочих процессах сводку отправляет только процесс, которому принадлежит администратор,
+    а в нее попадают и подтверждения, принятые другими процессами.
+    """
+
+    def __init__(self, interval=ADMIN_DIGEST_INTERVAL):
+        self.interval = interval
+        self.bot = None
+        # message_id -> количество подтверждений, уже учтенных в сводках
+        self._reported = None
+        # message_id -> ID сообщения со сводкой в чате администратора
+        self._digest_messages = {}
+        self._task = None
+
+    def start(self, bot: Bot):
+        """Запускает периодическую отправку сводок"""
+        self.bot = bot
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._send_periodically())
+
+    async def send(self):
+        """Отправляет или обновляет сводки по всем сообщениям с новыми подтверждениями"""
+        if self.bot is None or self._reported is None:
+            return
+
+        # Итоговые цифры считаются по базе, поэтому сначала записываем буфер подтверждений этого процесса
+        await confirmation_writer.flush()
+
+        for stats in await get_confirmation_counts(*user_shard()):
+            new = stats['confirmed'] - self._reported.get(stats['message_id'], 0)
+            if new <= 0:
+                continue
+
+            self._reported[stats['message_id']] = stats['confirmed']
+            try:
+                await self._send_digest(stats, new)
+            except Exception as e:
+                logging.error(f"Ошибка отправки сводки подтверждений по рассылке #{stats['message_id']}: {e}")
+
+    async def close(self):
+        """Останавливает периодическую отправку и отправляет последнюю сводку"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.send()
+
+    async def _load_reported(self):
+        # Подтверждения, полученные до запуска процесса, в сводки не попадают
+        self._reported = {
+            stats['message_id']: stats['confirmed'] for stats in await get_confirmation_counts(*user_shard())
+        }
+
+    async def _send_digest(self, stats, new):
+        message_id = stats['message_id']
+        admin_id = stats['sender_id']
+        kind = "кодовой фразы" if stats['is_code_phrase'] else "сообщения"
+
+        text = (
+            f"✅ {new} новых подтверждений получения {kind} #{message_id}\n"
+            f"Всего подтвердили: {stats['confirmed']} из {stats['delivered']}"
+        )
+
+        # Сводка расходует тот же лимит запросов, что и рассылки
+        await global_limiter.acquire()
+
+        digest_message_id = self._digest_messages.get(message_id)
+        if digest_message_id is not None:
+            try:
+                await self.bot.edit_message_text(text, chat_id=admin_id, message_id=digest_message_id)
+                return
+            except TelegramBadRequest:
+                # Сообщение со сводкой удалено или слишком старое - отправим новое
+                pass
+
+        sent = await self.bot.send_message(admin_id, text)
+        self._digest_messages[message_id] = sent.message_id
+
+    async def _send_periodically(self):
+        while self._reported is None:
+            try:
+                await self._load_reported()
+            except Exception as e:
+                logging.error(f"Ошибка загрузки счетчиков подтверждений для сводок: {e}")
+                await asyncio.sleep(self.interval)
+
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.send()
+            except Exception as e:
+                logging.error(f"Ошибка подготовки сводок подтверждений: {e}")
+
+# Общий накопитель сводок процесса
+confirmation_digest = ConfirmationDigest()
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import time
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from config import BROADCAST_PROGRESS_INTERVAL
+from database.db_operations import cancel_pending_deliveries, get_delivery_counts, get_unfinished_broadcasts
+from keyboards.admin_keyboards import admin_message_status, broadcast_job_controls
+from utils.broadcaster import Broadcaster
+from utils.notifications import send_message_to_users
+from utils.update_workers import owns_user
+
+class BroadcastJob:
+    """Фоновая рассылка с отображением прогресса в одном сообщении администратора"""
+
+    def __init__(self, bot: Bot, message_id: int, message_text: str, is_code_phrase: bool, chat_id: int, progress_message_id: int):
+        self.bot = bot
+        self.message_id = message_id
+        self.message_text = message_text
+        self.is_code_phrase = is_code_phrase
+        self.chat_id = chat_id
+        self.progress_message_id = progress_message_id
+        self.broadcaster = Broadcaster(bot)
+        self.status = "running"  # 'running', 'paused', 'cancelled', 'interrupted', 'finished', 'failed'
+        self.total = 0
+        self.sent = 0
+        self.failed = 0
+        self.resumed_from = 0
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self.task = None
+
+    @property
+    def job_id(self):
+        return self.message_id
+
+    @property
+    def remaining(self):
+        return max(0, self.total - self.sent - self.failed)
+
+    @property
+    def throughput(self):
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        processed = self.sent + self.failed - self.resumed_from
+        return processed / elapsed if elapsed > 0 else 0.0
+
+    def pause(self):
+        self.broadcaster.pause()
+        self.status = "paused"
+
+    def resume(self):
+        self.broadcaster.resume()
+        self.status = "running"
+
+    def cancel(self):
+        """Отменяет рассылку, неотправленные сообщения больше не будут отправлены"""
+        self.status = "cancelled"
+        if self.task:
+            self.task.cancel()
+
+    def interrupt(self):
+        """Прерывает рассылку при остановке бота, она продолжится после перезапуска"""
+        if self.task:
+            self.task.cancel()
+
+    async def run(self):
+        """Выполняет рассылку и периодически обновляет сообщение о прогрессе"""
+        reporter = asyncio.create_task(self._report_progress())
+        try:
+            # При продолжении после сбоя учитываются уже обработанные получатели
+            counts = await get_delivery_counts(self.message_id)
+            self.total = sum(counts.values()) - counts.get("cancelled", 0)
+            self.sent = counts.get("sent", 0)
+            self.failed = counts.get("failed", 0) + counts.get("blocked", 0)
+            self.resumed_from = self.sent + self.failed
+            await send_message_to_users(
+                self.bot, self.message_text, self.message_id,
+                broadcaster=self.broadcaster, on_result=self._on_result
+            )
+            self.status = "finished"
+        except asyncio.CancelledError:
+            if self.status == "cancelled":
+                await cancel_pending_deliveries(self.message_id)
+            else:
+                self.status = "interrupted"
+        except Exception as e:
+            logging.error(f"Ошибка фоновой рассылки #{self.message_id}: {e}", exc_info=True)
+            self.status = "failed"
+        finally:
+            self.finished_at = time.monotonic()
+            reporter.cancel()
+            await self._edit_progress(final=True)
+
+    async def _on_result(self, chat_id, message, error):
+        if error is None:
+            self.sent += 1
+        else:
+            self.failed += 1
+
+    async def _report_progress(self):
+        while True:
+            await asyncio.sleep(BROADCAST_PROGRESS_INTERVAL)
+            await self._edit_progress()
+
+    def render(self):
+        """Текст сообщения о ходе рассылки"""
+        titles = {
+            "running": "⏳ Идет рассылка",
+            "paused": "⏸ Рассылка приостановлена",
+            "cancelled": "⛔ Рассылка отменена",
+            "interrupted": "⏹ Рассылка прервана остановкой бота и продолжится после перезапуска",
+            "finished": "✅ Рассылка завершена!",
+            "failed": "⚠️ Рассылка прервана из-за ошибки",
+        }
+        kind = "кодовой фразы" if self.is_code_phrase else "сообщения"
+        text = f"{titles[self.status]} ({kind} #{self.message_id})\n\n"
+
+        if self.is_code_phrase:
+            text += f"🔑 Фраза: `{self.message_text}`\n\n"
+
+        text += (
+            f"📊 Статистика:\n"
+            f"- Отправлено: {self.sent}\n"
+            f"- Не удалось отправить: {self.failed}\n"
+            f"- Осталось: {self.remaining}\n"
+            f"- Скорость: {self.throughput:.1f} сообщ./с"
+        )
+        return text
+
+    async def _edit_progress(self, final=False):
+        if final:
+            reply_markup = admin_message_status(self.message_id)
+        else:
+            reply_markup = broadcast_job_controls(self.job_id, paused=self.status == "paused")
+
+        try:
+            await self.bot.edit_message_text(
+                self.render(),
+                chat_id=self.chat_id,
+                message_id=self.progress_message_id,
+                reply_markup=reply_markup,
+                parse_mode="Markdown"
+            )
+        except TelegramBadRequest as e:
+            # "message is not modified" и подобные ошибки не должны прерывать рассылку
+            logging.debug(f"Не удалось обновить прогресс рассылки #{self.message_id}: {e}")
+        except Exception as e:
+            logging.error(f"Ошибка обновления прогресса рассылки #{self.message_id}: {e}")
+
+class BroadcastJobRegistry:
+    """Реестр запущенных фоновых рассылок"""
+
+    def __init__(self):
+        self._jobs = {}
+
+    def start(self, bot: Bot, message_id: int, message_text: str, is_code_phrase: bool, chat_id: int, progress_message_id: int):
+        """Запускает рассылку в фоне и регистрирует ее"""
+        job = BroadcastJob(bot, message_id, message_text, is_code_phrase, chat_id, progress_message_id)
+        job.task = asyncio.create_task(job.run())
+        job.task.add_done_callback(lambda _: self._jobs.pop(job.job_id, None))
+        self._jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def active(self):
+        return list(self._jobs.values())
+
+    async def resume_unfinished(self, bot: Bot):
+        """Продолжает рассылки, прерванные сбоем или перезапуском бота
+
+        При нескольких рабочих процессах рассылку продолжает процесс, которому принадлежит
+        ее автор: туда же приходят его кнопки паузы и отмены.
+        """
+        for broadcast in await get_unfinished_broadcasts():
+            if broadcast['id'] in self._jobs or not owns_user(broadcast['sender_id']):
+                continue
+
+            progress = await bot.send_message(
+                broadcast['sender_id'],
+                f"🔁 Продолжаю прерванную рассылку #{broadcast['id']}...",
+                reply_markup=broadcast_job_controls(broadcast['id'])
+            )
+            self.start(
+                bot, broadcast['id'], broadcast['message_text'], broadcast['is_code_phrase'] == 1,
+                broadcast['sender_id'], progress.message_id
+            )
+            logging.info(f"Продолжена прерванная рассылка #{broadcast['id']}")
+
+    async def shutdown(self):
+        """Прерывает все рассылки при остановке бота"""
+        jobs = self.active()
+        for job in jobs:
+            job.interrupt()
+        await asyncio.gather(*(job.task for job in jobs), return_exceptions=True)
+
+# Общий реестр рассылок процесса
+broadcast_jobs = BroadcastJobRegistry()
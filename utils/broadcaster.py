@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import random
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError, TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+)
+from config import BROADCAST_CONCURRENCY, BROADCAST_MAX_RETRIES
+from utils.rate_limiter import global_limiter, chat_limiter
+
+# Ошибки, после которых имеет смысл повторить отправку
+TRANSIENT_ERRORS = (TelegramNetworkError, TelegramServerError)
+
+class Broadcaster:
+    """Рассылка сообщений с ограниченной конкурентностью и лимитами Telegram"""
+
+    def __init__(
+        self,
+        bot: Bot,
+        limiter=global_limiter,
+        per_chat_limiter=chat_limiter,
+        concurrency=BROADCAST_CONCURRENCY,
+        max_retries=BROADCAST_MAX_RETRIES,
+        backoff_base=0.5,
+        backoff_max=30.0
+    ):
+        self.bot = bot
+        self.limiter = limiter
+        self.per_chat_limiter = per_chat_limiter
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retries = 0
+        self._running = asyncio.Event()
+        self._running.set()
+
+    def pause(self):
+        """Приостанавливает отправку новых сообщений"""
+        self._running.clear()
+
+    def resume(self):
+        """Возобновляет отправку сообщений"""
+        self._running.set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    async def send(self, chat_id, payload=None, **kwargs):
+        """Отправляет одно сообщение с учетом лимитов и повторных попыток
+
+        payload - заранее подготовленное сообщение (PreparedMessage), иначе используется bot.send_message(**kwargs)
+        """
+        attempt = 0
+
+        while True:
+            await self._running.wait()
+            await self.per_chat_limiter.acquire(chat_id)
+            await self.limiter.acquire()
+            if self.paused:
+                # Пауза включена, пока ждали очереди на отправку
+                continue
+
+            try:
+                if payload is not None:
+                    return await payload.send(chat_id)
+                return await self.bot.send_message(chat_id=chat_id, **kwargs)
+            except TelegramRetryAfter as e:
+                # Flood control распространяется на весь бот, поэтому ставим на паузу общее ведро
+                logging.warning(f"Превышен лимит Telegram, пауза рассылки на {e.retry_after} с")
+                self.limiter.pause(e.retry_after)
+                error = e
+            except TRANSIENT_ERRORS as e:
+                await asyncio.sleep(self._backoff(attempt))
+                error = e
+
+            attempt += 1
+            self.retries += 1
+            if attempt > self.max_retries:
+                raise error
+
+    async def run(self, chat_ids, on_result=None, **kwargs):
+        """Рассылает сообщение по списку (или асинхронному потоку) ID чатов
+
+        on_result(chat_id, message, error) вызывается после каждой отправки.
+        Возвращает количество успешных и неудачных отправок.
+        """
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        counters = {"sent": 0, "failed": 0}
+
+        async def worker():
+            while True:
+                chat_id = await queue.get()
+                try:
+                    if chat_id is None:
+                        return
+                    message, error = None, None
+                    try:
+                        message = await self.send(chat_id, **kwargs)
+                        counters["sent"] += 1
+                    except TelegramAPIError as e:
+                        logging.error(f"Ошибка отправки сообщения пользователю {chat_id}: {e}")
+                        counters["failed"] += 1
+                        error = e
+                    except Exception as e:
+                        # Непредвиденная ошибка не должна останавливать обработчик очереди
+                        logging.exception(f"Сбой при отправке сообщения пользователю {chat_id}: {e}")
+                        counters["failed"] += 1
+                        error = e
+                    if on_result is not None:
+                        await on_result(chat_id, message, error)
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            if hasattr(chat_ids, "__aiter__"):
+                async for chat_id in chat_ids:
+                    await queue.put(chat_id)
+            else:
+                for chat_id in chat_ids:
+                    await queue.put(chat_id)
+
+            # Сигнал завершения для каждого обработчика
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+
+        return counters["sent"], counters["failed"]
+
+    def _backoff(self, attempt):
+        # Экспоненциальная задержка с полным джиттером
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
@@ -0,0 +1,66 @@
+import asyncio
+import time
+from config import CODE_PHRASES_CACHE_TTL
+from database.db_operations import get_all_code_phrases, get_code_phrases_version
+
+def render_code_phrases(code_phrases):
+    """Текст списка кодовых фраз для пользователя"""
+    lines = ["🔑 *Ваши кодовые фразы:*\n"]
+
+    for idx, phrase in enumerate(code_phrases, start=1):
+        if phrase['status'] == 'active':
+            lines.append(f"{idx}. `{phrase['message_text']}`\n")
+        elif phrase['status'] == 'outdated':
+            lines.append(f"{idx}. ~~`{phrase['message_text']}`~~ _(устарело)_\n")
+
+    return "\n".join(lines) + "\n"
+
+class CodePhraseCache:
+    """Готовый текст списка кодовых фраз, сбрасывается при изменении версии списка"""
+
+    def __init__(self, ttl=CODE_PHRASES_CACHE_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._text = None
+        self._version = None
+        self._loaded_at = 0.0
+        # Текст после промаха перестраивает один запрос, остальные ждут его результат
+        self._rebuild_lock = asyncio.Lock()
+
+    def _is_fresh(self):
+        return self._version == get_code_phrases_version() and time.monotonic() - self._loaded_at < self.ttl
+
+    async def get_text(self):
+        """Текст списка кодовых фраз или None, если фраз нет"""
+        if self._is_fresh():
+            self.hits += 1
+            return self._text
+
+        async with self._rebuild_lock:
+            # Пока запрос ждал блокировку, текст мог перестроить другой запрос
+            if self._is_fresh():
+                self.hits += 1
+                return self._text
+
+            self.misses += 1
+            version = get_code_phrases_version()
+            code_phrases = await get_all_code_phrases()
+
+            self._text = render_code_phrases(code_phrases) if code_phrases else None
+            self._version = version
+            self._loaded_at = time.monotonic()
+            return self._text
+
+    def stats(self):
+        """Счетчики попаданий и промахов кэша"""
+        total = self.hits + self.misses
+        return {
+            "size": int(self._text is not None),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+# Общий кэш кодовых фраз процесса
+code_phrase_cache = CodePhraseCache()
\ No newline at end of file
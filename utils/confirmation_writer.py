@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime
+from config import CONFIRM_FLUSH_INTERVAL_MS, CONFIRM_BATCH_SIZE
+from database.cache import LRUCache
+from database.db_operations import get_confirmed_user_ids, save_confirmations
+from utils.write_behind import WriteBehindBuffer
+
+class ConfirmationWriter(WriteBehindBuffer):
+    """Отложенная пакетная запись подтверждений с проверкой повторов в памяти"""
+
+    def __init__(self, flush_interval_ms=CONFIRM_FLUSH_INTERVAL_MS, batch_size=CONFIRM_BATCH_SIZE, tracked_messages=16):
+        super().__init__(flush_interval_ms / 1000, batch_size, description="подтверждений")
+        # Множества подтвердивших пользователей для последних сообщений
+        self._confirmed = LRUCache(maxsize=tracked_messages)
+        self._load_locks = {}
+
+    async def confirm(self, message_id, user_id, source_id=None):
+        """Регистрирует подтверждение, возвращает False, если оно уже было
+
+        source_id - исходное сообщение повторной рассылки: подтверждение засчитывается и ему.
+        В базе его копирует триггер trg_confirmation_resend, а запись в буфере нужна, чтобы
+        множество подтвердивших исходное сообщение в памяти не расходилось с базой.
+        """
+        confirmed = await self._confirmed_users(message_id)
+        if user_id in confirmed:
+            return False
+
+        confirmed.add(user_id)
+        confirmed_at = datetime.now()
+        self._buffer.append((message_id, user_id, confirmed_at))
+
+        if source_id is not None:
+            source_confirmed = await self._confirmed_users(source_id)
+            if user_id not in source_confirmed:
+                source_confirmed.add(user_id)
+                self._buffer.append((source_id, user_id, confirmed_at))
+
+        self.start()
+        self._added()
+        return True
+
+    async def _write(self, batch):
+        # Повторная вставка того же подтверждения игнорируется уникальным индексом
+        await save_confirmations(batch)
+
+    async def _confirmed_users(self, message_id):
+        confirmed = self._confirmed.get(message_id)
+        if confirmed is not None:
+            return confirmed
+
+        # Одновременные нажатия по одному сообщению загружают множество из базы один раз
+        lock = self._load_locks.setdefault(message_id, asyncio.Lock())
+        async with lock:
+            confirmed = self._confirmed.get(message_id)
+            if confirmed is None:
+                # Подтверждения из буфера и из записываемого пакета еще не попали в базу, но уже учитываются.
+                # Они собираются до чтения: пакет, записанный во время чтения, могло бы не увидеть ни то, ни другое
+                unwritten = {user_id for buffered_id, user_id, _ in self._unwritten() if buffered_id == message_id}
+                confirmed = await get_confirmed_user_ids(message_id)
+                confirmed.update(unwritten)
+                self._confirmed.set(message_id, confirmed)
+        self._load_locks.pop(message_id, None)
+        return confirmed
+
+# Общий буфер подтверждений процесса
+confirmation_writer = ConfirmationWriter()
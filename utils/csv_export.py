@@ -0,0 +1,30 @@
+import asyncio
+import csv
+import os
+import tempfile
+from database.db_operations import EXPORT_QUERIES, iter_export_rows
+
+async def export_to_csv(kind, message_id=None):
+    """Выгружает список в CSV-файл с постоянным расходом памяти
+
+    Строки читаются из базы пачками и сразу дописываются в файл в отдельном потоке,
+    чтобы запись на диск не блокировала цикл событий. Возвращает путь к файлу и число строк.
+    """
+    columns = EXPORT_QUERIES[kind][0]
+    fd, path = tempfile.mkstemp(prefix=f"export_{kind}_", suffix=".csv")
+    rows_written = 0
+
+    try:
+        # utf-8-sig, чтобы Excel правильно определил кодировку кириллицы
+        with os.fdopen(fd, "w", newline="", encoding="utf-8-sig") as file:
+            writer = csv.writer(file)
+            writer.writerow(columns)
+
+            async for batch in iter_export_rows(kind, message_id):
+                await asyncio.to_thread(writer.writerows, batch)
+                rows_written += len(batch)
+    except BaseException:
+        os.remove(path)
+        raise
+
+    return path, rows_written
@@ -0,0 +1,41 @@
+from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest
+from config import DELIVERY_BATCH_SIZE, DELIVERY_FLUSH_INTERVAL
+from database.db_operations import update_delivery_states, set_users_delivery_state
+from utils.write_behind import WriteBehindBuffer
+
+def delivery_state_for_error(error):
+    """Состояние доставки пользователя по ошибке отправки или None, если ошибка временная"""
+    if isinstance(error, TelegramForbiddenError):
+        return "deactivated" if "deactivated" in error.message else "blocked"
+    if isinstance(error, TelegramBadRequest) and "chat not found" in error.message:
+        return "deactivated"
+    return None
+
+class DeliveryRecorder(WriteBehindBuffer):
+    """Пакетная запись результатов отправки в таблицу deliveries"""
+
+    def __init__(self, message_id, batch_size=DELIVERY_BATCH_SIZE, interval=DELIVERY_FLUSH_INTERVAL):
+        super().__init__(interval, batch_size, description=f"результатов доставки рассылки #{message_id}")
+        self.message_id = message_id
+
+    async def record(self, user_id, message, error):
+        """Запоминает результат отправки одному получателю"""
+        # Буфер: (user_id, состояние доставки, ID сообщения в Telegram, новое состояние пользователя или None)
+        user_state = delivery_state_for_error(error)
+        if error is None:
+            self._buffer.append((user_id, "sent", message.message_id, None))
+        elif user_state is not None:
+            self._buffer.append((user_id, "blocked", None, user_state))
+        else:
+            self._buffer.append((user_id, "failed", None, None))
+        self._added()
+
+    async def _write(self, batch):
+        await update_delivery_states(
+            self.message_id, [(user_id, state, tg_message_id) for user_id, state, tg_message_id, _ in batch]
+        )
+
+        # Пользователи, которые заблокировали бота или удалили аккаунт
+        inactive = [(user_id, user_state) for user_id, _, _, user_state in batch if user_state is not None]
+        if inactive:
+            await set_users_delivery_state(inactive)
@@ -0,0 +1,91 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from config import HEARTBEAT_DIR, HEARTBEAT_INTERVAL, BOT_ROLE, WORKER_INDEX
+
+def heartbeat_path(role=BOT_ROLE, index=WORKER_INDEX):
+    """Путь к файлу пульса процесса бота с заданной ролью и номером"""
+    return os.path.join(HEARTBEAT_DIR, f"{role}-{index}.json")
+
+def read_heartbeat(path):
+    """Содержимое файла пульса или None, если файла нет или он поврежден"""
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+class Heartbeat:
+    """Периодическая запись состояния процесса бота в файл для супервизора"""
+
+    def __init__(self, path=None, interval=HEARTBEAT_INTERVAL):
+        self.path = path or heartbeat_path()
+        self.interval = interval
+        self.started_at = time.time()
+        self.serving_at = None
+        self.last_update_at = None
+        # Задержка между отправкой последнего обновления пользователем и его обработкой
+        self.last_update_lag = None
+        self.updates = 0
+        self._task = None
+
+    def start(self):
+        """Запускает периодическую запись пульса"""
+        if self._task is None or self._task.done():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._task = asyncio.create_task(self._beat_periodically())
+
+    def mark_serving(self):
+        """Отмечает момент, с которого процесс принимает обновления"""
+        if self.serving_at is None:
+            self.serving_at = time.time()
+            logging.info(f"Бот принимает обновления через {self.serving_at - self.started_at:.2f} с после запуска")
+
+    def record_update(self, sent_at=None):
+        """Учитывает полученное обновление; sent_at - время отправки из Telegram (unix time)"""
+        self.last_update_at = time.time()
+        if sent_at:
+            self.last_update_lag = max(0.0, self.last_update_at - sent_at)
+        self.updates += 1
+
+    async def close(self):
+        """Останавливает запись пульса и удаляет файл"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def snapshot(self):
+        return {
+            "pid": os.getpid(),
+            "time": time.time(),
+            "started_at": self.started_at,
+            "serving_at": self.serving_at,
+            "last_update_at": self.last_update_at,
+            "last_update_lag": self.last_update_lag,
+            "updates": self.updates,
+        }
+
+    def _write(self, snapshot):
+        # Запись во временный файл и замена, чтобы супервизор не прочитал файл наполовину
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(snapshot, file)
+        os.replace(tmp_path, self.path)
+
+    async def _beat_periodically(self):
+        while True:
+            try:
+                await asyncio.to_thread(self._write, self.snapshot())
+            except OSError as e:
+                logging.error(f"Ошибка записи пульса в {self.path}: {e}")
+            await asyncio.sleep(self.interval)
+
+# Пульс текущего процесса
+heartbeat = Heartbeat()
@@ -0,0 +1,89 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+from copy import copy
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from config import LOG_FILE, LOG_LEVEL, LOG_MAX_BYTES, LOG_BACKUP_COUNT, BOT_ROLE, WORKER_INDEX
+
+# Текстовый формат для вывода в консоль
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+class JsonFormatter(logging.Formatter):
+    """Запись лога в виде одной JSON-строки"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": getattr(record, "bot_process", None),
+            "pid": record.process,
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Передает записи в очередь, форматирование и запись выполняет поток QueueListener"""
+
+    def __init__(self, log_queue, process_name):
+        super().__init__(log_queue)
+        self.process_name = process_name
+
+    def prepare(self, record):
+        # Аргументы и трассировка переводятся в строки сразу: объекты могут измениться,
+        # пока запись ждет в очереди. Трассировка хранится отдельно от текста сообщения
+        record = copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.bot_process = self.process_name
+        return record
+
+def process_log_file(log_file=LOG_FILE):
+    """Файл лога процесса: при нескольких процессах у каждого свой файл, чтобы ротация не конфликтовала"""
+    if BOT_ROLE == "single":
+        return log_file
+    base, ext = os.path.splitext(log_file)
+    return f"{base}.{BOT_ROLE}-{WORKER_INDEX}{ext}"
+
+def setup_logging(log_file=None, stream=True, level=LOG_LEVEL):
+    """Настраивает неблокирующее логирование через очередь
+
+    Обработчики логгеров только кладут запись в очередь, а запись в файл (JSON, с ротацией
+    по размеру) и в консоль выполняет отдельный поток. Возвращает запущенный QueueListener.
+    """
+    handlers = []
+
+    file_handler = RotatingFileHandler(
+        log_file or process_log_file(), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+    file_handler.setFormatter(JsonFormatter())
+    handlers.append(file_handler)
+
+    if stream:
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(stream_handler)
+
+    # Очередь без ограничения размера: запись в нее никогда не ждет
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(NonBlockingQueueHandler(log_queue, f"{BOT_ROLE}-{WORKER_INDEX}"))
+    root.setLevel(level)
+
+    listener.start()
+    # При выходе дописываем все записи, оставшиеся в очереди
+    atexit.register(listener.stop)
+    return listener
@@ -1,30 +1,38 @@
-import asyncio
-import logging
 from aiogram import Bot
-from aiogram.exceptions import TelegramAPIError
-from database.db_operations import get_all_users
+from database.db_operations import iter_pending_deliveries
 from keyboards.user_keyboards import confirm_button
+from utils.broadcaster import Broadcaster
+from utils.delivery_recorder import DeliveryRecorder
+from utils.prepared_message import PreparedMessage
 
-async def send_message_to_users(bot: Bot, message_text: str, message_id: int):
-    """Отправляет сообщение всем пользователям бота"""
-    users = await get_all_users()
-    sent_count = 0
-    failed_count = 0
+async def send_message_to_users(bot: Bot, message_text: str, message_id: int, broadcaster=None, on_result=None):
+    """Отправляет сообщение получателям рассылки, которым оно еще не отправлено"""
+    recorder = DeliveryRecorder(message_id)
+    recorder.start()
     
-    for user in users:
-        try:
-            # Отправляем сообщение с кнопкой подтверждения
-            await bot.send_message(
-                chat_id=user['user_id'],
-                text=f"📢 *Важное сообщение:*\n\n{message_text}",
-                reply_markup=confirm_button(message_id),
-                parse_mode="Markdown"
-            )
-            sent_count += 1
-            # Небольшая задержка, чтобы не превысить лимиты Telegram API
-            await asyncio.sleep(0.1)
-        except TelegramAPIError as e:
-            logging.error(f"Ошибка отправки сообщения пользователю {user['user_id']}: {e}")
-            failed_count += 1
+    async def handle_result(chat_id, message, error):
+        await recorder.record(chat_id, message, error)
+        if on_result is not None:
+            await on_result(chat_id, message, error)
+    
+    # Текст и клавиатура сериализуются один раз на всю рассылку, для каждого получателя меняется только chat_id
+    payload = PreparedMessage(
+        bot,
+        text=f"📢 *Важное сообщение:*\n\n{message_text}",
+        reply_markup=confirm_button(message_id),
+        parse_mode="Markdown"
+    )
+    
+    # Отправляем сообщение с кнопкой подтверждения с учетом лимитов Telegram API
+    broadcaster = broadcaster or Broadcaster(bot)
+    try:
+        sent_count, failed_count = await broadcaster.run(
+            iter_pending_deliveries(message_id),
+            on_result=handle_result,
+            payload=payload
+        )
+    finally:
+        # Результаты сохраняются и при отмене рассылки
+        await recorder.close()
     
     return sent_count, failed_count
\ No newline at end of file
@@ -0,0 +1,64 @@
+import asyncio
+import json
+from collections import namedtuple
+from aiohttp import ClientError, ClientTimeout
+from aiogram import Bot
+from aiogram.exceptions import TelegramNetworkError
+from aiogram.methods import SendMessage
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Результат отправки: рассылке нужен только ID отправленного сообщения
+SentMessage = namedtuple("SentMessage", ["message_id", "chat_id"])
+
+class PreparedMessage:
+    """Сообщение рассылки, подготовленное и сериализованное один раз
+
+    Текст, разметка и клавиатура переводятся в JSON при создании объекта, при отправке
+    к готовому телу запроса добавляется только chat_id. Запрос отправляется через
+    HTTP-сессию бота напрямую, минуя проверку и сериализацию метода aiogram. Ошибки
+    Telegram разбираются стандартным check_response, поэтому исключения те же, что у bot.send_message.
+    """
+
+    def __init__(self, bot: Bot, text, **kwargs):
+        self.bot = bot
+        # Метод-образец: из него берутся значения по умолчанию бота, он же попадает в исключения
+        self.method = SendMessage(chat_id=0, text=text, **kwargs)
+        self.url = bot.session.api.api_url(bot.token, self.method.__api_method__)
+        self.timeout = ClientTimeout(total=bot.session.timeout)
+
+        fields = bot.session.prepare_value(self.method.model_dump(warnings=False), bot=bot, files={}, _dumps_json=False)
+        fields.pop("chat_id")
+        # Тело запроса без открывающей скобки: b'{"chat_id":' + chat_id + b',' + body_tail
+        self._body_tail = json.dumps(fields, ensure_ascii=False, separators=(",", ":"))[1:].encode("utf-8")
+
+    def body(self, chat_id):
+        """Тело запроса sendMessage для одного получателя"""
+        return b'{"chat_id":' + str(chat_id).encode() + b"," + self._body_tail
+
+    async def send(self, chat_id):
+        """Отправляет сообщение одному получателю"""
+        session = await self.bot.session.create_session()
+
+        try:
+            async with session.post(
+                self.url, data=self.body(chat_id), headers=JSON_HEADERS, timeout=self.timeout
+            ) as response:
+                status = response.status
+                content = await response.read()
+        except asyncio.TimeoutError:
+            raise TelegramNetworkError(method=self.method, message="Request timeout error")
+        except ClientError as e:
+            raise TelegramNetworkError(method=self.method, message=f"{type(e).__name__}: {e}")
+
+        if status == 200:
+            try:
+                data = json.loads(content)
+            except ValueError:
+                data = None
+            if data and data.get("ok"):
+                return SentMessage(data["result"]["message_id"], chat_id)
+
+        # Ошибки разбираются так же, как в aiogram: TelegramRetryAfter, TelegramForbiddenError и т.д.
+        response = self.bot.session.check_response(self.bot, self.method, status, content.decode("utf-8"))
+        return SentMessage(response.result.message_id, chat_id)
@@ -0,0 +1,39 @@
+from config import PROFILE_FLUSH_INTERVAL, PROFILE_CACHE_SIZE
+from database.cache import LRUCache
+from database.db_operations import update_user_profiles
+from utils.write_behind import WriteBehindBuffer
+
+class ProfileRefresher(WriteBehindBuffer):
+    """Отложенная пакетная запись изменившихся имен пользователей
+
+    Профиль из каждого входящего обновления сравнивается с последним виденным в памяти,
+    в базу периодически записываются только изменения.
+    """
+
+    def __init__(self, interval=PROFILE_FLUSH_INTERVAL, cache_size=PROFILE_CACHE_SIZE):
+        super().__init__(interval, description="профилей пользователей")
+        # user_id -> (username, first_name, last_name), последний виденный профиль
+        self._known = LRUCache(maxsize=cache_size)
+
+    def observe(self, user):
+        """Учитывает профиль пользователя из обновления (без обращения к базе)"""
+        profile = (user.username, user.first_name, user.last_name)
+        if self._known.get(user.id) == profile:
+            return
+
+        self._known.set(user.id, profile)
+        # Буфер - словарь user_id -> профиль, ожидающий записи
+        self._buffer[user.id] = profile
+
+    def _new_buffer(self):
+        return {}
+
+    def _restore(self, batch):
+        # Более новые профили из буфера важнее незаписанного пакета
+        self._buffer = {**batch, **self._buffer}
+
+    async def _write(self, batch):
+        await update_user_profiles([(user_id, *profile) for user_id, profile in batch.items()])
+
+# Общий буфер профилей процесса
+profile_refresher = ProfileRefresher()
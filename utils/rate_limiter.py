@@ -0,0 +1,82 @@
+import asyncio
+import time
+from config import BROADCAST_RATE_LIMIT, BROADCAST_CHAT_RATE_LIMIT
+
+class TokenBucket:
+    """Ограничитель скорости по алгоритму token bucket"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Ждет, пока в ведре появится токен, и забирает его"""
+        # Под блокировкой ожидающие получают токены строго по очереди
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Приостанавливает выдачу токенов (например, по TelegramRetryAfter)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        # После паузы начинаем с пустого ведра, чтобы не получить всплеск запросов
+        self._tokens = 0
+        self._updated_at = self._paused_until
+
+    @property
+    def paused(self):
+        return time.monotonic() < self._paused_until
+
+    def _refill(self, now):
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+
+class ChatRateLimiter:
+    """Ограничитель частоты сообщений в один чат"""
+
+    # Порог, после которого из словаря удаляются давно неактивные чаты
+    CLEANUP_THRESHOLD = 10000
+
+    def __init__(self, rate=BROADCAST_CHAT_RATE_LIMIT):
+        self.interval = 1 / rate
+        self._next_allowed = {}
+
+    async def acquire(self, chat_id):
+        """Ждет, пока в чат снова можно отправить сообщение"""
+        now = time.monotonic()
+        next_allowed = self._next_allowed.get(chat_id, now)
+        self._next_allowed[chat_id] = max(now, next_allowed) + self.interval
+
+        if len(self._next_allowed) > self.CLEANUP_THRESHOLD:
+            self._cleanup(now)
+
+        if next_allowed > now:
+            await asyncio.sleep(next_allowed - now)
+
+    def _cleanup(self, now):
+        self._next_allowed = {
+            chat_id: next_allowed
+            for chat_id, next_allowed in self._next_allowed.items()
+            if next_allowed > now
+        }
+
+# Общие лимиты процесса: все рассылки делят один бюджет запросов к Telegram
+global_limiter = TokenBucket(BROADCAST_RATE_LIMIT)
+chat_limiter = ChatRateLimiter()
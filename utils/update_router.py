@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import signal
+import aiohttp
+from aiogram import Bot
+from config import (
+    BOT_MODE, BOT_WORKERS, WORKER_BASE_PORT, SHARD_SECRET, WEBHOOK_BASE_URL, WEBHOOK_PATH,
+    WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE
+)
+from utils.update_workers import UpdateWorkers, extract_user_id
+from utils.heartbeat import heartbeat
+from utils.webhook_server import WebhookServer, SECRET_HEADER, serve
+
+class UpdateRouter:
+    """Передача обновлений рабочим процессам по user_id % shards
+
+    Рабочий процесс отвечает 200 только после обработки обновления. Если он ответил 503,
+    недоступен или упал, не ответив (например, во время перезапуска), обновление
+    передается повторно, пока не будет обработано.
+    """
+
+    def __init__(self, shards=BOT_WORKERS, base_port=WORKER_BASE_PORT, secret=SHARD_SECRET, retry_delay=0.1, retry_max=5):
+        self.shards = shards
+        self.urls = [f"http://127.0.0.1:{base_port + shard}{WEBHOOK_PATH}" for shard in range(shards)]
+        self.headers = {SECRET_HEADER: secret} if secret else {}
+        self.retry_delay = retry_delay
+        self.retry_max = retry_max
+        self.forwarded = 0
+        self.retries = 0
+        self._session = None
+
+    async def forward(self, update):
+        """Передает обновление рабочему процессу, которому принадлежит пользователь"""
+        if self._session is None or self._session.closed:
+            # Общего ограничения времени нет: ответ приходит после обработки, а зависший
+            # рабочий процесс перезапускает супервизор, и запрос завершается ошибкой соединения
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None, connect=5))
+
+        url = self.urls[extract_user_id(update) % self.shards]
+        delay = self.retry_delay
+        while True:
+            try:
+                async with self._session.post(url, json=update, headers=self.headers) as response:
+                    if response.status == 200:
+                        self.forwarded += 1
+                        return
+                    if response.status in (400, 401):
+                        # Повтор не поможет: обновление некорректно или секреты процессов не совпадают
+                        logging.error(f"Рабочий процесс {url} отклонил обновление {update.get('update_id')} ({response.status})")
+                        return
+            except aiohttp.ClientError:
+                pass
+
+            self.retries += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.retry_max)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+async def poll_updates(bot: Bot, updates: UpdateWorkers, allowed_updates, stop: asyncio.Event, timeout=30):
+    """Получает обновления long polling'ом и передает их в очереди
+
+    getUpdates вызывается напрямую, без разбора ответа в объекты aiogram. Смещение
+    подтверждается только после того, как вся пачка обработана рабочими процессами,
+    поэтому при падении приемника или рабочего процесса обновления будут получены заново.
+    """
+    session = await bot.session.create_session()
+    url = bot.session.api.api_url(bot.token, "getUpdates")
+    request_timeout = aiohttp.ClientTimeout(total=timeout + 10)
+    params = {"timeout": timeout, "allowed_updates": allowed_updates}
+
+    try:
+        while not stop.is_set():
+            try:
+                async with session.post(url, json=params, timeout=request_timeout) as response:
+                    payload = await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                logging.warning(f"Ошибка получения обновлений: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            if not payload.get("ok"):
+                logging.error(f"Telegram вернул ошибку при получении обновлений: {payload.get('description')}")
+                await asyncio.sleep(payload.get("parameters", {}).get("retry_after", 1))
+                continue
+
+            batch = payload["result"]
+            for update in batch:
+                await updates.put(update)
+
+            if batch:
+                await updates.join()
+                params["offset"] = batch[-1]["update_id"] + 1
+    finally:
+        # Telegram считает обновления полученными только после запроса со следующим смещением
+        if "offset" in params:
+            try:
+                async with session.post(url, json={**params, "timeout": 0, "limit": 1}, timeout=request_timeout):
+                    pass
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logging.warning(f"Не удалось подтвердить полученные обновления: {e}")
+
+async def run_receiver(bot: Bot, allowed_updates):
+    """Запускает процесс-приемник: получает обновления и распределяет их между рабочими процессами"""
+    router = UpdateRouter()
+
+    async def forward(update):
+        message = update.get("message") or update.get("edited_message") or {}
+        heartbeat.record_update(message.get("date"))
+        await router.forward(update)
+
+    # Передача ждет окончания обработки, поэтому для каждого рабочего процесса столько же параллельных
+    # передач, сколько у него обработчиков. Обновления пользователя идут через одну очередь, по порядку
+    updates = UpdateWorkers(forward, BOT_WORKERS * WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE)
+
+    try:
+        if BOT_MODE == "webhook":
+            app = WebhookServer.public(updates).create_app()
+
+            async def on_startup(app):
+                await bot.set_webhook(
+                    f"{WEBHOOK_BASE_URL}{WEBHOOK_PATH}",
+                    secret_token=WEBHOOK_SECRET,
+                    allowed_updates=allowed_updates,
+                    drop_pending_updates=False
+                )
+                heartbeat.mark_serving()
+
+            app.on_startup.append(on_startup)
+            logging.info(f"Приемник вебхука распределяет обновления между {BOT_WORKERS} процессами")
+            await serve(app, WEBHOOK_HOST, WEBHOOK_PORT)
+        else:
+            stop = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, stop.set)
+
+            await bot.delete_webhook(drop_pending_updates=False)
+            updates.start()
+            heartbeat.mark_serving()
+            logging.info(f"Приемник распределяет обновления между {BOT_WORKERS} процессами")
+
+            polling = asyncio.create_task(poll_updates(bot, updates, allowed_updates, stop))
+            await asyncio.wait([polling, asyncio.create_task(stop.wait())], return_when=asyncio.FIRST_COMPLETED)
+            polling.cancel()
+            await asyncio.gather(polling, return_exceptions=True)
+            await updates.stop()
+    finally:
+        await router.close()
+        await bot.session.close()
+        await heartbeat.close()
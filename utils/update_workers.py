@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from config import BOT_ROLE, BOT_WORKERS, WORKER_INDEX
+
+def user_shard():
+    """Количество рабочих процессов и номер этого процесса: пользователь принадлежит процессу user_id % количество
+
+    Вне роли рабочего процесса все пользователи принадлежат одному процессу.
+    """
+    if BOT_ROLE == "worker":
+        return BOT_WORKERS, WORKER_INDEX
+    return 1, 0
+
+def owns_user(user_id):
+    """Обрабатывает ли этот процесс обновления пользователя"""
+    workers, index = user_shard()
+    return user_id % workers == index
+
+def extract_user_id(update):
+    """ID пользователя (или чата), к которому относится обновление, без разбора через pydantic"""
+    for key, value in update.items():
+        if key == "update_id" or not isinstance(value, dict):
+            continue
+        for field in ("from", "user", "chat"):
+            entity = value.get(field)
+            if isinstance(entity, dict) and "id" in entity:
+                return entity["id"]
+    return 0
+
+class UpdateWorkers:
+    """Ограниченная параллельная обработка обновлений
+
+    У каждого обработчика своя очередь, обновление попадает в нее по ID пользователя,
+    поэтому обновления одного пользователя обрабатываются строго по порядку.
+    Если обновления уже разделены между процессами по user_id % sharded_by,
+    распределение по очередям учитывает это, чтобы очереди загружались равномерно.
+    """
+
+    def __init__(self, process, workers, queue_size, sharded_by=1):
+        self.process = process
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.sharded_by = max(1, sharded_by)
+        self.processed = 0
+        self.failed = 0
+        self._queues = []
+        self._tasks = []
+
+    def start(self):
+        """Запускает обработчики"""
+        if not self._tasks:
+            self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+            self._tasks = [asyncio.create_task(self._worker(queue)) for queue in self._queues]
+
+    def submit(self, update):
+        """Ставит обновление в очередь без ожидания
+
+        Возвращает future, которое завершается после обработки обновления (и при ошибке
+        обработчика, она только записывается в лог), или None, если очередь заполнена.
+        Если процесс остановился раньше, future отменяется.
+        """
+        done = asyncio.get_running_loop().create_future()
+        try:
+            self._queue_for(update).put_nowait((update, done))
+        except asyncio.QueueFull:
+            return None
+        return done
+
+    async def put(self, update):
+        """Ставит обновление в очередь, дожидаясь свободного места"""
+        await self._queue_for(update).put((update, asyncio.get_running_loop().create_future()))
+
+    async def join(self):
+        """Дожидается обработки всех поставленных в очередь обновлений"""
+        await asyncio.gather(*(queue.join() for queue in self._queues))
+
+    async def stop(self, timeout=30):
+        """Дорабатывает принятые обновления и останавливает обработчики"""
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning("Не все принятые обновления обработаны до остановки")
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        # Необработанные обновления не подтверждаются: отправитель доставит их повторно
+        for queue in self._queues:
+            while not queue.empty():
+                _, done = queue.get_nowait()
+                done.cancel()
+
+    def _queue_for(self, update):
+        return self._queues[extract_user_id(update) // self.sharded_by % self.workers]
+
+    async def _worker(self, queue):
+        while True:
+            update, done = await queue.get()
+            try:
+                await self.process(update)
+                self.processed += 1
+            except asyncio.CancelledError:
+                done.cancel()
+                raise
+            except Exception as e:
+                # Повторная доставка не исправит ошибку обработчика, поэтому обновление считается обработанным
+                self.failed += 1
+                logging.error(f"Ошибка обработки обновления {update.get('update_id')}: {e}", exc_info=True)
+            finally:
+                queue.task_done()
+
+            if not done.done():
+                done.set_result(None)
@@ -0,0 +1,142 @@
+import asyncio
+import hmac
+import logging
+import signal
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import setup_application
+from config import (
+    WEBHOOK_BASE_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT,
+    WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE, BOT_WORKERS, WORKER_BASE_PORT, WORKER_INDEX, SHARD_SECRET
+)
+from utils.update_workers import UpdateWorkers
+
+# Заголовок, в котором Telegram передает секретный токен вебхука
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+def require_webhook_secret():
+    """Проверяет, что для публичного вебхука задан секретный токен
+
+    Без него кто угодно мог бы присылать на открытый адрес поддельные обновления,
+    поэтому режим вебхука без WEBHOOK_SECRET не запускается.
+    """
+    if not WEBHOOK_SECRET:
+        raise RuntimeError("Для режима вебхука необходимо задать WEBHOOK_SECRET")
+
+class WebhookServer:
+    """Прием обновлений по HTTP с передачей их в ограниченные очереди обработки
+
+    Сервер отвечает 200 только после обработки обновления: если процесс упадет или
+    перезапустится раньше, отправитель (Telegram или процесс-приемник) не получит ответа
+    и доставит обновление повторно. Если очередь переполнена, сервер сразу отвечает 503,
+    и отправитель повторит доставку позже. Число ожидающих ответа запросов ограничено
+    размером очередей.
+    """
+
+    def __init__(self, updates: UpdateWorkers, secret):
+        self.updates = updates
+        self.secret = secret
+        self.accepted = 0
+        self.rejected = 0
+
+    async def handle(self, request: web.Request):
+        """Обработчик POST-запроса с обновлением"""
+        # Без секрета работает только внутренний сервер рабочего процесса на 127.0.0.1
+        if self.secret and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), self.secret):
+            return web.Response(status=401)
+
+        try:
+            update = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+
+        done = self.updates.submit(update)
+        if done is None:
+            # Не теряем обновление: отправитель повторит запрос, пока сервер не разгрузится
+            self.rejected += 1
+            return web.Response(status=503)
+
+        self.accepted += 1
+        await asyncio.wait([done])
+        if done.cancelled():
+            # Процесс остановился до обработки обновления
+            return web.Response(status=503)
+        return web.Response()
+
+    def create_app(self):
+        """aiohttp-приложение с маршрутом вебхука"""
+        app = web.Application()
+        app.router.add_post(WEBHOOK_PATH, self.handle)
+        app.on_startup.append(self._on_startup)
+        app.on_shutdown.append(self._on_shutdown)
+        return app
+
+    async def _on_startup(self, app):
+        self.updates.start()
+
+    async def _on_shutdown(self, app):
+        await self.updates.stop()
+
+    @classmethod
+    def public(cls, updates: UpdateWorkers):
+        """Сервер публичного вебхука Telegram (только с секретным токеном)"""
+        require_webhook_secret()
+        return cls(updates, secret=WEBHOOK_SECRET)
+
+def dispatcher_workers(bot: Bot, dp: Dispatcher, sharded_by=1):
+    """Очереди, передающие обновления в диспетчер"""
+    async def process(update):
+        await dp.feed_raw_update(bot, update)
+
+    return UpdateWorkers(process, WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE, sharded_by=sharded_by)
+
+async def serve(app, host, port):
+    """Запускает aiohttp-приложение и работает до сигнала остановки процесса"""
+    runner = web.AppRunner(app)
+    await runner.setup()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    try:
+        await web.TCPSite(runner, host, port).start()
+        await stop.wait()
+    finally:
+        # Остановка приложения дорабатывает принятые обновления
+        await runner.cleanup()
+
+async def run_webhook(bot: Bot, dp: Dispatcher):
+    """Запускает бота в режиме вебхука до остановки процесса"""
+    app = WebhookServer.public(dispatcher_workers(bot, dp)).create_app()
+    # Событие остановки диспетчера (закрытие базы) выполняется после обработки очередей
+    setup_application(app, dp, bot=bot)
+
+    async def on_startup(app):
+        # Накопившиеся за время перезапуска обновления не сбрасываются, Telegram доставит их заново
+        await bot.set_webhook(
+            f"{WEBHOOK_BASE_URL}{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+            drop_pending_updates=False
+        )
+        logging.info(f"Вебхук запущен на {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+    app.on_startup.append(on_startup)
+    try:
+        await serve(app, WEBHOOK_HOST, WEBHOOK_PORT)
+    finally:
+        await bot.session.close()
+
+async def run_worker(bot: Bot, dp: Dispatcher):
+    """Запускает рабочий процесс, обрабатывающий свою часть пользователей (user_id % BOT_WORKERS)"""
+    app = WebhookServer(dispatcher_workers(bot, dp, sharded_by=BOT_WORKERS), secret=SHARD_SECRET).create_app()
+    setup_application(app, dp, bot=bot)
+
+    port = WORKER_BASE_PORT + WORKER_INDEX
+    logging.info(f"Рабочий процесс {WORKER_INDEX} из {BOT_WORKERS} принимает обновления на 127.0.0.1:{port}")
+    try:
+        await serve(app, "127.0.0.1", port)
+    finally:
+        await bot.session.close()
@@ -0,0 +1,87 @@
+import asyncio
+import itertools
+import logging
+
+class WriteBehindBuffer:
+    """Отложенная пакетная запись в базу данных
+
+    Изменения копятся в буфере и записываются одной транзакцией по таймеру или при
+    заполнении пакета. Подкласс задает только запись пакета (_write). Запись должна быть
+    идемпотентной: пакет, который не удалось записать, возвращается в буфер и записывается повторно.
+    """
+
+    def __init__(self, interval, batch_size=None, description="изменений"):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.description = description
+        self.flushed = 0
+        self._buffer = self._new_buffer()
+        # Пакет, который записывается сейчас: он уже не в буфере, но еще не в базе
+        self._writing = None
+        self._batch_ready = asyncio.Event()
+        self._task = None
+
+    @property
+    def pending(self):
+        return len(self._buffer)
+
+    def start(self):
+        """Запускает периодическую запись накопленных изменений"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_periodically())
+
+    async def flush(self):
+        """Записывает накопленные изменения одной транзакцией"""
+        if not self._buffer:
+            return
+
+        # Буфер подменяется до записи, чтобы новые изменения не потерялись во время ожидания
+        batch, self._buffer = self._buffer, self._new_buffer()
+        self._writing = batch
+        try:
+            await self._write(batch)
+            self.flushed += len(batch)
+        except asyncio.CancelledError:
+            self._restore(batch)
+            raise
+        except Exception as e:
+            logging.error(f"Ошибка записи {self.description} ({len(batch)} шт.): {e}")
+            self._restore(batch)
+        finally:
+            self._writing = None
+
+    async def close(self):
+        """Останавливает периодическую запись и сохраняет остаток буфера"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def _unwritten(self):
+        """Изменения, которых еще нет в базе: записываемый сейчас пакет и буфер"""
+        return itertools.chain(self._writing or (), self._buffer)
+
+    def _added(self):
+        """Вызывается подклассом после добавления в буфер: заполненный пакет записывается сразу"""
+        if self.batch_size and len(self._buffer) >= self.batch_size:
+            self._batch_ready.set()
+
+    def _new_buffer(self):
+        return []
+
+    def _restore(self, batch):
+        # Незаписанный пакет возвращается в начало буфера, перед более новыми изменениями
+        self._buffer[:0] = batch
+
+    async def _write(self, batch):
+        raise NotImplementedError
+
+    async def _flush_periodically(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self.flush()